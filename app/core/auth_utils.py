@@ -1,6 +1,11 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import jose.jwt
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from .security_config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
@@ -18,6 +23,59 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# --- Hashing fuera del event loop ---
+# bcrypt suelta el GIL, así que un pool de hilos propio y acotado basta para que una
+# ráfaga de logins no ocupe el threadpool de FastAPI ni las conexiones a la DB.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_lock = threading.Lock()
+_hash_stats = {"pending": 0, "running": 0, "peak_pending": 0, "completed": 0, "rejected": 0}
+
+
+def _tracked(fn, *args):
+    with _hash_lock:
+        _hash_stats["running"] += 1
+    try:
+        return fn(*args)
+    finally:
+        with _hash_lock:
+            _hash_stats["running"] -= 1
+            _hash_stats["completed"] += 1
+
+
+async def _run_hashing(fn, *args):
+    with _hash_lock:
+        if _hash_stats["pending"] >= PASSWORD_HASH_MAX_PENDING:
+            _hash_stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _hash_stats["pending"] += 1
+        _hash_stats["peak_pending"] = max(_hash_stats["peak_pending"], _hash_stats["pending"])
+    try:
+        return await asyncio.wrap_future(_hash_executor.submit(_tracked, fn, *args))
+    finally:
+        with _hash_lock:
+            _hash_stats["pending"] -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+def hashing_stats() -> dict:
+    with _hash_lock:
+        # queued = en cola esperando un hilo libre del executor
+        stats = dict(_hash_stats, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
+    stats["queued"] = max(stats["pending"] - stats["running"], 0)
+    return stats
+
 # --- Funciones de JWT (Hardened) ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria del proceso, acotada en número de entradas y con
+    expiración por entrada. Segura entre hilos (el threadpool de FastAPI).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Registro de cachés por nombre, para exponer sus contadores en /admin/metrics
+caches = {}
+
+# "memory": una caché por proceso. "shared": un fichero mapeado en memoria que
+# comparten todos los workers de gunicorn (ver app/core/shared_cache.py).
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+# Directorio privado del despliegue (p. ej. /dev/shm/vesta-prod); obligatorio con "shared"
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR")
+SHARED_CACHE_SLOT_BYTES = int(os.getenv("SHARED_CACHE_SLOT_BYTES", "1024"))
+
+# Dataclasses que el backend compartido sabe guardar (como JSON), por nombre
+shared_types: Dict[str, type] = {}
+
+
+def shared_value(cls: type) -> type:
+    """Registra una dataclass como valor válido de la caché compartida."""
+    shared_types[cls.__name__] = cls
+    return cls
+
+
+def create_cache(name: str, maxsize: int, ttl: Optional[float], slot_bytes: Optional[int] = None):
+    """
+    Punto único de creación de cachés: aquí se decide el backend.
+    `slot_bytes` es el tamaño máximo de una entrada en el backend compartido.
+    """
+    if CACHE_BACKEND == "shared":
+        from app.core.shared_cache import SharedMemoryCache
+        if not SHARED_CACHE_DIR:
+            raise ValueError("CACHE_BACKEND=shared requires SHARED_CACHE_DIR")
+        cache = SharedMemoryCache(
+            name, maxsize=maxsize, ttl=ttl, slot_bytes=slot_bytes or SHARED_CACHE_SLOT_BYTES, directory=SHARED_CACHE_DIR,
+        )
+    elif CACHE_BACKEND == "memory":
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+    else:
+        raise ValueError(f"Unknown cache backend: {CACHE_BACKEND}")
+    caches[name] = cache
+    return cache
+
+
+def attach_caches() -> None:
+    """Conecta los backends compartidos al arrancar el worker (no-op en memoria)."""
+    for cache in caches.values():
+        attach = getattr(cache, "attach", None)
+        if attach is not None:
+            attach()
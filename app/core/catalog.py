@@ -0,0 +1,63 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+from app import database
+from app.core.periodic import PeriodicTask
+from app.core.versions import read_versions
+from app.models.categories import Category
+from app.schemas.categories import CategoryPublic
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_VERSION = "categories"
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "2.0"))
+
+_categories_adapter = TypeAdapter(List[CategoryPublic])
+
+
+class CategoryCatalog:
+    """
+    Copia en memoria del catálogo de categorías, ya serializada a JSON y con su ETag.
+    Cada worker compara periódicamente su versión con CacheVersion("categories")
+    y solo recarga la tabla cuando otro proceso la ha cambiado.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        # (body, etag) en una sola tupla: se sustituye de una vez y un lector nunca mezcla
+        # el cuerpo nuevo con el ETag viejo (el cliente lo guardaría con el ETag equivocado)
+        self.snapshot: Tuple[bytes, str] = (b"[]", "")
+        self.reloads = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def _load(self, session: Session, version: int) -> None:
+        categories = session.exec(select(Category).order_by(Category.id)).all()
+        body = _categories_adapter.dump_json([CategoryPublic.model_validate(c, from_attributes=True) for c in categories])
+        # ETag por contenido: igual en todos los workers que tengan la misma versión
+        self.snapshot = (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+        self.version = version
+        self.reloads += 1
+
+    def refresh(self) -> bool:
+        """Recarga si la versión en BD cambió (una consulta de una fila). True si recargó."""
+        with self._lock, Session(database.engine) as session:
+            version = read_versions(session, [CATEGORIES_VERSION])[CATEGORIES_VERSION]
+            if version == self.version:
+                return False
+            self._load(session, version)
+            return True
+
+    def stats(self) -> dict:
+        return {"version": self.version, "reloads": self.reloads, "size": len(self.snapshot[0])}
+
+
+category_catalog = CategoryCatalog()
+catalog_poller = PeriodicTask("category-catalog", CATALOG_POLL_INTERVAL, category_catalog.refresh)
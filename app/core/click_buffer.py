@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from app import database
+from app.models.affiliates import ClickEvent
+
+logger = logging.getLogger(__name__)
+
+
+class ClickBuffer:
+    """
+    Cola acotada de clics en memoria. El redirect solo encola; un hilo de fondo
+    inserta los eventos por lotes (al llenarse un lote o cada `flush_interval`).
+
+    Políticas de desborde cuando la cola está llena:
+      - "drop_newest": se descarta el clic entrante.
+      - "drop_oldest": se descarta el clic más antiguo para hacer sitio.
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float, overflow_policy: str = "drop_newest"):
+        if overflow_policy not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"Unknown click buffer overflow policy: {overflow_policy}")
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def add(self, link_id: int, user_id: Optional[int], referrer: Optional[str]) -> bool:
+        event = {
+            "link_id": link_id,
+            "user_id": user_id,
+            "referrer": referrer,
+            "created_at": datetime.utcnow(),
+        }
+        with self._cond:
+            if len(self._queue) >= self.max_size:
+                self.dropped += 1
+                if self.overflow_policy == "drop_newest":
+                    return False
+                self._queue.popleft()
+            self._queue.append(event)
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush(self) -> int:
+        """Inserta todo lo pendiente, en lotes de `batch_size`. Devuelve cuántos se guardaron."""
+        total = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return total
+                try:
+                    with database.engine.begin() as connection:
+                        connection.execute(ClickEvent.__table__.insert(), batch)
+                except Exception:
+                    logger.exception("Click buffer flush failed; %d events requeued", len(batch))
+                    self._requeue(batch)
+                    self.failed_flushes += 1
+                    return total
+                self.flushed += len(batch)
+                total += len(batch)
+
+    def _requeue(self, batch) -> None:
+        # Devolvemos el lote al frente sin pasar del tamaño máximo
+        with self._cond:
+            room = self.max_size - len(self._queue)
+            if room < len(batch):
+                self.dropped += len(batch) - max(room, 0)
+                batch = batch[len(batch) - max(room, 0):]
+            self._queue.extendleft(reversed(batch))
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="click-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Detiene el hilo de fondo vaciando antes la cola (apagado ordenado)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._queue)
+        return {
+            "pending": pending,
+            "max_size": self.max_size,
+            "batch_size": self.batch_size,
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+click_buffer = ClickBuffer(
+    max_size=int(os.getenv("CLICK_BUFFER_MAX_SIZE", "50000")),
+    batch_size=int(os.getenv("CLICK_BUFFER_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("CLICK_BUFFER_FLUSH_INTERVAL", "1.0")),
+    overflow_policy=os.getenv("CLICK_BUFFER_OVERFLOW", "drop_newest"),
+)
@@ -0,0 +1,39 @@
+import os
+import random
+from typing import Optional
+from sqlmodel import Session, select, func
+from app.database import dialect_insert
+from app.models.stats import PlatformCounters
+
+# Los contadores se reparten en varias filas (id = nº de shard) y se suman al leer:
+# las transacciones concurrentes casi nunca esperan por la misma fila
+COUNTER_SHARDS = int(os.getenv("COUNTER_SHARDS", "16"))
+COUNTER_FIELDS = ("total_users", "total_products", "total_sales", "total_revenue")
+
+
+def bump_counters(session: Session, **deltas) -> None:
+    """
+    Suma los deltas (total_users=1, total_revenue=9.99, ...) a un shard de contadores
+    elegido al azar (uno por sesión), con un upsert atómico dentro de la transacción actual.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    shard = session.info.setdefault("counter_shard", random.randrange(COUNTER_SHARDS))
+    statement = dialect_insert(session, PlatformCounters).values(
+        id=shard, **{name: deltas.get(name, 0) for name in COUNTER_FIELDS}
+    )
+    session.exec(statement.on_conflict_do_update(
+        index_elements=["id"],
+        set_={name: getattr(PlatformCounters, name) + delta for name, delta in deltas.items()},
+    ))
+
+
+def read_counters(session: Session) -> Optional[dict]:
+    """Totales sumando todos los shards (una consulta), o None si aún no hay ninguno."""
+    row = session.exec(
+        select(func.count(PlatformCounters.id), *[func.sum(getattr(PlatformCounters, name)) for name in COUNTER_FIELDS])
+    ).one()
+    if not row[0]:
+        return None
+    return dict(zip(COUNTER_FIELDS, row[1:]))
@@ -0,0 +1,23 @@
+import hashlib
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """ETag fuerte a partir de validadores baratos (versiones, parámetros de la página)."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:16]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparación débil (RFC 9110): ignoramos el prefijo W/
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Iterator, Sequence
+from sqlmodel import Session, select
+from app import database
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_export(columns: Sequence, fmt: str, *conditions) -> Iterator[str]:
+    """
+    Genera el volcado por bloques de EXPORT_BATCH_SIZE filas. Abre su propia sesión
+    (la del request ya está cerrada cuando empieza el streaming) y lee con un cursor
+    de servidor: la memoria no depende del número de filas.
+    """
+    names = [column.key for column in columns]
+    statement = (
+        select(*columns)
+        .where(*conditions)
+        .order_by(columns[0])
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    with Session(database.engine) as session:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for partition in session.exec(statement).partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for partition in session.exec(statement).partitions():
+                yield "".join(
+                    json.dumps({name: _to_json(value) for name, value in zip(names, row)}) + "\n"
+                    for row in partition
+                )
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+from app import database
+from app.database import dialect_insert
+from app.core.periodic import PeriodicTask
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", "300"))
+IDEMPOTENCY_SWEEP_BATCH = 1000
+MAX_KEY_LENGTH = 255
+# status_code de una clave reservada cuya petición aún no ha terminado
+IN_PROGRESS = 0
+
+
+class IdempotentRequest:
+    """
+    Clave Idempotency-Key de una petición de escritura. Uso en el endpoint:
+
+        replay = idem.claim(session)
+        if replay is not None:
+            return replay
+        ... escritura sin commit ...
+        return idem.commit(session, result)
+
+    claim() es la primera sentencia de la transacción: inserta la clave "en curso" con
+    ON CONFLICT DO NOTHING. Un reintento simultáneo espera en ese INSERT a que termine
+    el original y entonces reproduce su respuesta (o, si el original falló y se deshizo,
+    se queda la clave y ejecuta la petición él).
+    """
+
+    def __init__(self, scope: str, key: Optional[str], request: Request):
+        if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key inválida")
+        self.key = key
+        self.key_hash = hashlib.sha256(f"{scope}\0{key}".encode()).digest()
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        self.fingerprint = hashlib.sha256(f"{request.method} {request.url.path}?{query}".encode()).digest()
+
+    def claim(self, session: Session) -> Optional[JSONResponse]:
+        """Reserva la clave para esta petición (None) o devuelve la respuesta original."""
+        if self.key is None:
+            return None
+        now = datetime.utcnow()
+        pending = {
+            "fingerprint": self.fingerprint,
+            "status_code": IN_PROGRESS,
+            "response": "",
+            "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL),
+        }
+        inserted = session.exec(
+            dialect_insert(session, IdempotencyKey)
+            .values(key_hash=self.key_hash, **pending)
+            .on_conflict_do_nothing(index_elements=["key_hash"])
+        ).rowcount
+        if inserted:
+            return None
+
+        record = session.exec(
+            select(IdempotencyKey).where(IdempotencyKey.key_hash == self.key_hash).with_for_update()
+        ).first()
+        if record is None:
+            # La barrió el sweeper entre el INSERT y la lectura
+            return self.claim(session)
+        if record.expires_at <= now:
+            # Caducada: se reutiliza para esta petición
+            session.exec(
+                update(IdempotencyKey).where(IdempotencyKey.key_hash == self.key_hash).values(**pending)
+            )
+            return None
+        if record.fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key ya usada con otra petición")
+        if record.status_code == IN_PROGRESS:
+            raise HTTPException(status_code=409, detail="Petición con esta Idempotency-Key en curso")
+        return JSONResponse(json.loads(record.response), status_code=record.status_code)
+
+    def commit(self, session: Session, result, status_code: int = 200):
+        """Hace commit de la escritura junto con la respuesta a recordar."""
+        if self.key is not None:
+            session.exec(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == self.key_hash)
+                .values(status_code=status_code, response=json.dumps(jsonable_encoder(result)))
+            )
+        session.commit()
+        return result
+
+
+def sweep_expired_keys(now: Optional[datetime] = None) -> int:
+    """Borra por lotes las claves caducadas. Devuelve cuántas se eliminaron."""
+    now = now or datetime.utcnow()
+    removed = 0
+    with Session(database.engine) as session:
+        while True:
+            expired = session.exec(
+                select(IdempotencyKey.key_hash)
+                .where(IdempotencyKey.expires_at <= now)
+                .limit(IDEMPOTENCY_SWEEP_BATCH)
+            ).all()
+            if not expired:
+                return removed
+            session.exec(delete(IdempotencyKey).where(IdempotencyKey.key_hash.in_(expired)))
+            session.commit()
+            removed += len(expired)
+
+
+idempotency_sweeper = PeriodicTask("idempotency-sweeper", IDEMPOTENCY_SWEEP_INTERVAL, sweep_expired_keys)
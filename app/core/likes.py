@@ -0,0 +1,60 @@
+from sqlalchemy import delete, update
+from sqlmodel import Session
+from app.database import dialect_insert
+from app.models.interactions import ProductLike
+from app.models.products import Product
+from app.models.users import User
+
+
+def toggle_like_row(session: Session, user_id: int, product_id: int) -> int:
+    """
+    Quita el like si existe y si no lo crea; devuelve el cambio real en filas (-1, +1).
+    El delta sale de lo que hizo la BD, no de una lectura previa: dos toggles simultáneos
+    del mismo usuario no pueden restar dos veces ni chocar con la clave única.
+    """
+    for _ in range(2):
+        removed = session.exec(
+            delete(ProductLike)
+            .where(ProductLike.user_id == user_id, ProductLike.product_id == product_id)
+            .returning(ProductLike.user_id)
+        ).first()
+        if removed is not None:
+            return -1
+        inserted = session.exec(
+            dialect_insert(session, ProductLike)
+            .values(user_id=user_id, product_id=product_id)
+            .on_conflict_do_nothing(index_elements=["user_id", "product_id"])
+        )
+        if inserted.rowcount:
+            return 1
+        # Otro toggle lo insertó entre medias (y ya está confirmado): ahora lo quitamos
+    return 0
+
+
+def apply_like_delta(session: Session, product_id: int, delta: int) -> int:
+    """
+    Suma `delta` a Product.like_count con un UPDATE atómico dentro de la
+    transacción actual y devuelve el nuevo valor.
+    """
+    statement = (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(like_count=Product.like_count + delta)
+        .returning(Product.like_count)
+    )
+    # synchronize_session (por defecto) mantiene al día los Product ya cargados
+    return session.exec(statement).scalar_one()
+
+
+def apply_reputation_delta(session: Session, user_id: int, delta) -> int:
+    """
+    Igual que apply_like_delta, para User.reputation del dueño del producto.
+    `delta` puede ser una expresión SQL (p. ej. un recuento de likes).
+    """
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(reputation=User.reputation + delta)
+        .returning(User.reputation)
+    )
+    return session.exec(statement).scalar_one()
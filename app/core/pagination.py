@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, tuple_
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """Token opaco (base64 url-safe) con el modo de orden y la clave del último elemento."""
+    payload = [sort] + [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str, columns: Sequence[Any]) -> List[Any]:
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except ValueError:
+        raise invalid
+
+    if not isinstance(payload, list) or len(payload) != len(columns) + 1 or payload[0] != sort:
+        raise invalid
+
+    values = []
+    for column, value in zip(columns, payload[1:]):
+        try:
+            values.append(_coerce(column, value))
+        except (TypeError, ValueError):
+            raise invalid
+    return values
+
+
+def _coerce(column: Any, value: Any) -> Any:
+    """Valida un valor del cursor contra el tipo Python de su columna (un cursor manipulado es un 400, no un 500)."""
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        # Expresiones sin tipo (p. ej. el rank de la búsqueda): siempre numéricas
+        python_type = float
+    if isinstance(value, bool):
+        raise TypeError(value)
+    if python_type is int and isinstance(value, int):
+        return value
+    if python_type is float and isinstance(value, (int, float)):
+        return float(value)
+    if python_type is str and isinstance(value, str):
+        return value
+    raise TypeError(value)
+
+
+def keyset_paginate(
+    statement,
+    sort: str,
+    columns: Sequence[Any],
+    descending: bool,
+    cursor: Optional[str],
+    limit: int,
+):
+    """
+    Aplica ORDER BY + WHERE (col1, col2) </> (:v1, :v2) + LIMIT sobre `statement`.
+    Pedimos limit + 1 filas para saber si existe una página siguiente sin COUNT(*).
+    """
+    if cursor:
+        after = decode_cursor(cursor, sort, columns)
+        key = tuple_(*columns)
+        statement = statement.where(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return statement.order_by(*order).limit(limit + 1)
+
+
+def split_page(
+    rows: Sequence[Any],
+    sort: str,
+    columns: Sequence[Any],
+    limit: int,
+    values_of: Optional[Callable[[Any], Sequence[Any]]] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Recorta la fila extra y genera el next_cursor a partir del último elemento.
+    `values_of` extrae la clave de una fila cuando no son atributos del modelo.
+    """
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        values = values_of(last) if values_of else [getattr(last, c.key) for c in columns]
+        next_cursor = encode_cursor(sort, values)
+    return items, next_cursor
@@ -0,0 +1,96 @@
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlmodel import Session
+from app.core.cache import create_cache
+from app.core.versions import read_versions
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+# Entradas más grandes no se guardan: memoria acotada a SIZE * MAX_ENTRY_BYTES
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(256 * 1024)))
+# Con CACHE_BACKEND=shared cada slot tiene tamaño fijo: las respuestas mayores no se comparten
+RESPONSE_CACHE_SLOT_BYTES = int(os.getenv("RESPONSE_CACHE_SLOT_BYTES", str(16 * 1024)))
+
+
+class ResponseCache:
+    """
+    Caché de respuestas JSON ya serializadas, por ruta + query normalizada.
+
+    Invalidación por tags: cada tag es una fila de CacheVersion y cada entrada guarda
+    las versiones vigentes al crearse. Quien modifica los datos sube la versión del tag
+    con bump_versions en su misma transacción, así que la invalidación llega a todos los
+    workers (y al backend compartido) a la vez que el cambio, sin tener que localizar
+    las entradas afectadas.
+
+    Uso: tokens = begin(session, tags) ANTES de consultar la BD, luego get(request, tokens)
+    y, si falla, render(request, tokens, ...). Así un cambio que se confirma durante la
+    consulta deja la entrada guardada con la versión vieja y la siguiente petición la
+    descarta, en vez de guardar datos viejos bajo la versión nueva.
+    """
+
+    def __init__(self, backend, max_entry_bytes: int):
+        self.backend = backend
+        self.max_entry_bytes = max_entry_bytes
+        self._adapters: Dict[Any, TypeAdapter] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.too_large = 0
+
+    @staticmethod
+    def key(request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"resp:{request.url.path}?{query}"
+
+    def begin(self, session: Session, tags: Iterable[str]) -> tuple:
+        """Versiones vigentes de `tags` (una lectura por PK); hay que leerlas antes de la consulta."""
+        return tuple(read_versions(session, tags).values())
+
+    def get(self, request: Request, tokens: tuple) -> Optional[Response]:
+        entry = self.backend.get(self.key(request))
+        if entry is not None and entry[0] == tokens:
+            with self._lock:
+                self.hits += 1
+            return Response(content=entry[1], media_type="application/json", headers={"X-Cache": "HIT"})
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self.stale += 1
+        return None
+
+    def render(self, request: Request, tokens: tuple, response_model: Any, data: Any) -> Response:
+        """
+        Serializa `data` como lo haría FastAPI con `response_model`, guarda los bytes y responde.
+        `tokens` son los que devolvió begin() antes de leer `data`.
+        """
+        adapter = self._adapters.get(response_model)
+        if adapter is None:
+            adapter = self._adapters.setdefault(response_model, TypeAdapter(response_model))
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        if len(body) <= self.max_entry_bytes:
+            self.backend.set(self.key(request), (tokens, body))
+        else:
+            with self._lock:
+                self.too_large += 1
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+    def stats(self) -> dict:
+        backend = self.backend.stats()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "too_large": self.too_large,
+            "evictions": backend["evictions"],
+            "size": backend["size"],
+        }
+
+
+response_cache = ResponseCache(
+    create_cache("responses", maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL, slot_bytes=RESPONSE_CACHE_SLOT_BYTES),
+    max_entry_bytes=RESPONSE_CACHE_MAX_ENTRY_BYTES,
+)
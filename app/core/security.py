@@ -1,43 +1,106 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jose.jwt
 from sqlmodel import Session, select
 from app.database import get_session
 from app.models.users import User
+from .cache import create_cache, shared_value
 from .security_config import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
-) -> User:
-    credentials_exception = HTTPException(
+
+@shared_value
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Lo mínimo del usuario autenticado para endpoints que solo necesitan su id."""
+    id: int
+    username: str
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(id=user.id, username=user.username, is_admin=user.is_admin)
+
+
+# username (claim "sub" ya verificado) -> UserSnapshot
+user_cache = create_cache(
+    "users",
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
+
+def invalidate_cached_user(username: str) -> None:
+    user_cache.delete(username)
+
+
+def decode_username(token: str) -> Optional[str]:
+    """Verifica el JWT y devuelve su "sub", o None si no es válido."""
+    try:
+        payload = jose.jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jose.jwt.JWTError:
+        return None
+    return payload.get("sub")
+
+
+def resolve_user_snapshot(session: Session, username: str) -> Optional[UserSnapshot]:
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        user = session.exec(select(User).where(User.username == username)).first()
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        user_cache.set(username, snapshot)
+    return snapshot
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jose.jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            # Aquí faltaba la instrucción que causaba el error
-            raise credentials_exception
-    except jose.jwt.JWTError:
-        raise credentials_exception
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_session)
+) -> User:
+    username = decode_username(token)
+    if username is None:
+        raise _credentials_exception()
 
     user = session.exec(select(User).where(User.username == username)).first()
 
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
+    user_cache.set(username, UserSnapshot.from_user(user))
     return user
 
+def get_current_user_snapshot(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_session)
+) -> UserSnapshot:
+    """Como get_current_user, pero sin tocar la base de datos si el usuario está en caché."""
+    username = decode_username(token)
+    if username is None:
+        raise _credentials_exception()
+
+    snapshot = resolve_user_snapshot(session, username)
+    if snapshot is None:
+        raise _credentials_exception()
+    return snapshot
+
 def get_current_admin_user(current_user: User = Depends(get_current_user)):
+    # Los permisos de admin se comprueban siempre contra la base de datos
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user does not have enough privileges"
         )
     return current_user
-
@@ -0,0 +1,366 @@
+import base64
+import dataclasses
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import stat
+import struct
+import threading
+import time
+from typing import Any, Hashable, Optional
+from app.core.cache import shared_types
+
+# Cabecera del fichero: magic, nº de slots, bytes por slot
+HEADER = struct.Struct("<8sII")
+HEADER_SIZE = 64
+MAGIC = b"VESTASC1"
+
+# Cabecera de cada slot: seq, hash de la clave, expira (time.time(), 0 = nunca),
+# longitud de la clave, longitud del valor. Le siguen clave y valor (JSON, ver _encode_value).
+SLOT = struct.Struct("<QQdHI")
+SEQ = struct.Struct("<Q")
+
+PROBE_LENGTH = 8
+READ_RETRIES = 16
+
+
+CACHE_SUFFIX = ".cache"
+
+
+def _to_json(value: Any) -> Any:
+    # Cada objeto JSON es un contenedor etiquetado (tupla, bytes, dict, dataclass) con su
+    # contenido en una lista: json.loads los reconstruye con object_hook, sin recorrido en Python
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    if isinstance(value, tuple):
+        return {"t": [_to_json(item) for item in value]}
+    if isinstance(value, bytes):
+        return {"b": base64.b64encode(value).decode()}
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {"m": [[key, _to_json(item)] for key, item in value.items()]}
+    cls = type(value)
+    if dataclasses.is_dataclass(value) and shared_types.get(cls.__name__) is cls:
+        return {"d": [cls.__name__] + [_to_json(getattr(value, f.name)) for f in dataclasses.fields(value)]}
+    raise TypeError(f"{cls.__name__} cannot be stored in the shared cache (see app.core.cache.shared_value)")
+
+
+def _from_json(obj: dict) -> Any:
+    (tag, payload), = obj.items()
+    if tag == "t":
+        return tuple(payload)
+    if tag == "b":
+        return base64.b64decode(payload)
+    if tag == "m":
+        return dict(payload)
+    # Solo tipos registrados: el contenido del fichero nunca decide qué código se ejecuta
+    return shared_types[payload[0]](*payload[1:])
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+_decoder = json.JSONDecoder(object_hook=_from_json)
+
+
+def _encode_value(value: Any) -> bytes:
+    return _encoder.encode(_to_json(value)).encode()
+
+
+def _decode_value(data: bytes) -> Any:
+    return _decoder.decode(data.decode())
+
+
+def _check_private(st: os.stat_result, what: str, kind) -> None:
+    """Solo ficheros de este usuario y sin permisos para nadie más: otro usuario no puede plantarlos."""
+    if not kind(st.st_mode) or st.st_uid != os.geteuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{what} must be owned by uid {os.geteuid()} with no group/other permissions")
+
+
+def open_cache_dir(directory: str) -> int:
+    """Crea (0700) o valida el directorio de la caché y devuelve un descriptor sin seguir enlaces."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+    try:
+        _check_private(os.fstat(fd), directory, stat.S_ISDIR)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def remove_cache_files(directory: str) -> None:
+    """
+    Borra los ficheros de caché del directorio. Lo llama el master de gunicorn al
+    arrancar y al salir (gunicorn.conf.py), sin workers vivos que los tengan mapeados.
+    """
+    if not os.path.isdir(directory):
+        return
+    dir_fd = open_cache_dir(directory)
+    try:
+        for entry in os.listdir(dir_fd):
+            if entry.endswith(CACHE_SUFFIX) or entry.endswith(".tmp"):
+                os.unlink(entry, dir_fd=dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class SharedMemoryCache:
+    """
+    Caché compartida entre procesos sobre un fichero mapeado en memoria (por defecto
+    en /dev/shm): tabla hash de slots fijos con sondeo lineal acotado.
+
+    Lecturas sin bloqueo estilo seqlock: cada slot lleva un contador `seq` que el
+    escritor pone impar mientras escribe y par al terminar; el lector copia el slot
+    y lo descarta si `seq` era impar o cambió entre medias. Las escrituras se
+    serializan con un lock de fichero (entre procesos) y uno de hilo (dentro del worker).
+
+    El directorio es la identidad del despliegue: todos los procesos que lo comparten
+    (workers, manage.py, set_admin.py) ven las mismas entradas. Debe ser privado (0700)
+    y de este usuario; los valores se guardan como JSON, nunca con pickle.
+
+    Misma interfaz que TTLCache. Los contadores hits/misses/evictions son del proceso.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: Optional[float], slot_bytes: int, directory: str):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.slot_bytes = max(slot_bytes, SLOT.size + 64)
+        self.nslots = max(maxsize, PROBE_LENGTH)
+        self.directory = directory
+        self.filename = f"{name}{CACHE_SUFFIX}"
+        self.path = os.path.join(directory, self.filename)
+        self._map: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.too_large = 0
+
+    # --- Conexión al fichero ---------------------------------------------------------
+
+    def attach(self) -> None:
+        """
+        Abre (o crea e inicializa) el fichero compartido. Idempotente por proceso.
+        Un fichero que no encaja con esta configuración nunca se trunca (otro worker
+        vivo podría tenerlo mapeado y moriría con SIGBUS): se sustituye por uno nuevo.
+        """
+        if self._map is not None and self._pid == os.getpid():
+            return
+        if self._map is not None:
+            # Hijo de un fork (gunicorn --preload): el mapeo y el descriptor siguen
+            # valiendo, pero el lock de hilo heredado podría estar tomado
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+            return
+
+        size = HEADER_SIZE + self.nslots * self.slot_bytes
+        header = HEADER.pack(MAGIC, self.nslots, self.slot_bytes)
+        dir_fd = open_cache_dir(self.directory)
+        try:
+            # Lock del directorio: dos workers que arrancan a la vez acaban en el mismo fichero
+            fcntl.flock(dir_fd, fcntl.LOCK_EX)
+            fd = self._open_existing(dir_fd, size, header)
+            if fd is None:
+                fd = self._create(dir_fd, size, header)
+        finally:
+            os.close(dir_fd)
+        self._map = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self._fd = fd
+        self._pid = os.getpid()
+
+    def _open_existing(self, dir_fd: int, size: int, header: bytes) -> Optional[int]:
+        try:
+            fd = os.open(self.filename, os.O_RDWR | os.O_NOFOLLOW, dir_fd=dir_fd)
+        except FileNotFoundError:
+            return None
+        try:
+            st = os.fstat(fd)
+            _check_private(st, self.path, stat.S_ISREG)
+            if st.st_size == size and os.pread(fd, HEADER.size, 0) == header:
+                return fd
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+        return None
+
+    def _create(self, dir_fd: int, size: int, header: bytes) -> int:
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        try:
+            os.unlink(tmp, dir_fd=dir_fd)
+        except FileNotFoundError:
+            pass
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600, dir_fd=dir_fd)
+        try:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+            # Sustitución atómica: quien tuviera mapeado el fichero anterior sigue con su inodo
+            os.replace(tmp, self.filename, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def _write_locked(self):
+        self.attach()
+        return _WriteLock(self)
+
+    # --- Slots -------------------------------------------------------------------------
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> bytes:
+        return repr(key).encode()
+
+    @staticmethod
+    def _hash(key_bytes: bytes) -> int:
+        # 0 marca un slot vacío
+        return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little") or 1
+
+    def _offset(self, index: int) -> int:
+        return HEADER_SIZE + index * self.slot_bytes
+
+    def _probe(self, key_hash: int):
+        start = key_hash % self.nslots
+        for i in range(PROBE_LENGTH):
+            yield (start + i) % self.nslots
+
+    def _read_slot(self, offset: int) -> Optional[tuple]:
+        """Copia coherente del slot (hash, expira, clave, valor) o None si no se pudo leer."""
+        data = self._map
+        for _ in range(READ_RETRIES):
+            seq, key_hash, expires_at, key_len, value_len = SLOT.unpack_from(data, offset)
+            if seq & 1:
+                continue
+            start = offset + SLOT.size
+            payload = data[start:start + key_len + value_len] if key_hash else b""
+            if SEQ.unpack_from(data, offset)[0] != seq:
+                continue
+            return key_hash, expires_at, payload[:key_len], payload[key_len:]
+        return None
+
+    def _write_slot(self, offset: int, key_hash: int, expires_at: float, key_bytes: bytes, value: bytes) -> None:
+        data = self._map
+        seq = SEQ.unpack_from(data, offset)[0]
+        # Impar mientras se escribe; si un escritor murió a medias seguimos desde su valor impar
+        writing = seq + 1 if seq % 2 == 0 else seq + 2
+        SEQ.pack_into(data, offset, writing)
+        SLOT.pack_into(data, offset, writing, key_hash, expires_at, len(key_bytes), len(value))
+        start = offset + SLOT.size
+        data[start:start + len(key_bytes) + len(value)] = key_bytes + value
+        SEQ.pack_into(data, offset, writing + 1)
+
+    # --- Interfaz de caché ---------------------------------------------------------------
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        self.attach()
+        key_bytes = self._encode_key(key)
+        key_hash = self._hash(key_bytes)
+        for index in self._probe(key_hash):
+            slot = self._read_slot(self._offset(index))
+            if slot is None or slot[0] != key_hash or slot[2] != key_bytes:
+                continue
+            if slot[1] and slot[1] <= time.time():
+                break
+            try:
+                value = _decode_value(slot[3])
+            except (ValueError, KeyError, TypeError):
+                # Entrada de otra versión del código: se trata como ausente
+                break
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else 0.0
+        key_bytes = self._encode_key(key)
+        value_bytes = _encode_value(value)
+        if SLOT.size + len(key_bytes) + len(value_bytes) > self.slot_bytes:
+            self.too_large += 1
+            return
+        key_hash = self._hash(key_bytes)
+        now = time.time()
+        with self._write_locked():
+            target = None
+            victim, victim_expiry = None, None
+            for index in self._probe(key_hash):
+                offset = self._offset(index)
+                _, slot_hash, slot_expiry, key_len, _ = SLOT.unpack_from(self._map, offset)
+                if slot_hash == key_hash:
+                    start = offset + SLOT.size
+                    if self._map[start:start + key_len] == key_bytes:
+                        target = offset
+                        break
+                if not slot_hash or (slot_expiry and slot_expiry <= now):
+                    if target is None:
+                        target = offset
+                    continue
+                # Sin hueco: se expulsa la entrada que caduca antes (las eternas, las últimas)
+                expiry = slot_expiry or float("inf")
+                if victim is None or expiry < victim_expiry:
+                    victim, victim_expiry = offset, expiry
+            if target is None:
+                target = victim
+                self.evictions += 1
+            self._write_slot(target, key_hash, expires_at, key_bytes, value_bytes)
+
+    def delete(self, key: Hashable) -> None:
+        key_bytes = self._encode_key(key)
+        key_hash = self._hash(key_bytes)
+        with self._write_locked():
+            for index in self._probe(key_hash):
+                offset = self._offset(index)
+                _, slot_hash, _, key_len, _ = SLOT.unpack_from(self._map, offset)
+                start = offset + SLOT.size
+                if slot_hash == key_hash and self._map[start:start + key_len] == key_bytes:
+                    self._write_slot(offset, 0, 0.0, b"", b"")
+
+    def clear(self) -> None:
+        with self._write_locked():
+            for index in range(self.nslots):
+                self._write_slot(self._offset(index), 0, 0.0, b"", b"")
+
+    def __len__(self) -> int:
+        self.attach()
+        now = time.time()
+        count = 0
+        for index in range(self.nslots):
+            _, slot_hash, expires_at, _, _ = SLOT.unpack_from(self._map, self._offset(index))
+            if slot_hash and not (expires_at and expires_at <= now):
+                count += 1
+        return count
+
+    def stats(self) -> dict:
+        return {
+            "backend": "shared",
+            "path": self.path,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "slot_bytes": self.slot_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "too_large": self.too_large,
+        }
+
+
+class _WriteLock:
+    """Lock de hilo + lock POSIX sobre el primer byte del fichero (entre procesos)."""
+
+    def __init__(self, cache: SharedMemoryCache):
+        self.cache = cache
+
+    def __enter__(self):
+        self.cache._lock.acquire()
+        fcntl.lockf(self.cache._fd, fcntl.LOCK_EX, 1, 0)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.lockf(self.cache._fd, fcntl.LOCK_UN, 1, 0)
+        self.cache._lock.release()
@@ -0,0 +1,91 @@
+import re
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import and_, column, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.engine import Connection
+from app.models.products import Product
+
+# Postgres: columna tsvector generada (se mantiene sola en INSERT/UPDATE) + índice GIN
+POSTGRES_DDL = [
+    "ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS ix_product_search_vector ON product USING GIN (search_vector)",
+]
+
+# SQLite: tabla sombra FTS5 (external content) sincronizada con triggers
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "title, description, content='product', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF title, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO product_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+_fts = table("product_fts", column("rowid"))
+
+
+def install_text_search(connection: Connection) -> None:
+    """Crea (idempotente) las estructuras de búsqueda del dialecto actual."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for ddl in POSTGRES_DDL:
+            connection.execute(text(ddl))
+    elif dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'product_fts'")
+        ).first()
+        for ddl in SQLITE_DDL:
+            connection.execute(text(ddl))
+        if not exists:
+            # Indexamos las filas que ya existían antes de crear la tabla sombra
+            connection.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+
+
+def search_terms(q: str) -> List[str]:
+    # Solo caracteres de palabra: evita inyectar operadores de tsquery / FTS5
+    return re.findall(r"\w+", q.lower())
+
+
+def text_search_clause(dialect: str, q: str) -> Optional[Tuple[Any, Any]]:
+    """
+    Devuelve (condición, rank) para buscar `q` en el dialecto dado, donde un rank
+    mayor significa más relevante. Cada término se busca como prefijo ("lap" -> laptop).
+    None si `q` no contiene ningún término buscable.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    if dialect == "postgresql":
+        vector = literal_column("product.search_vector")
+        query = func.to_tsquery(
+            literal_column("'simple'::regconfig"),
+            " & ".join(f"{t}:*" for t in terms),
+        )
+        return vector.op("@@")(query), func.ts_rank(vector, query)
+
+    if dialect == "sqlite":
+        match = literal_column("product_fts").op("MATCH")(" ".join(f'"{t}"*' for t in terms))
+        condition = Product.id.in_(select(_fts.c.rowid).where(match))
+        # bm25 es "menor = mejor"; lo invertimos para ordenar siempre de mayor a menor
+        rank = (
+            select(-func.bm25(literal_column("product_fts")))
+            .where(match, _fts.c.rowid == Product.id)
+            .scalar_subquery()
+        )
+        return condition, rank
+
+    # Otros motores: sin índice de texto, mantenemos el ILIKE de siempre
+    condition = and_(*[
+        or_(Product.title.icontains(term), Product.description.icontains(term))
+        for term in terms
+    ])
+    return condition, literal(0.0)
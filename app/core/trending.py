@@ -0,0 +1,255 @@
+import fcntl
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.periodic import PeriodicTask
+
+TRENDING_HALF_LIFE = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24")) * 3600
+TRENDING_K = int(os.getenv("TRENDING_K", "100"))
+TRENDING_PATH = os.getenv("TRENDING_PATH", "trending.json")
+TRENDING_PERSIST_INTERVAL = float(os.getenv("TRENDING_PERSIST_INTERVAL", "30"))
+
+# Peso de cada señal
+LIKE_WEIGHT = 1.0
+PURCHASE_WEIGHT = 3.0
+CLICK_WEIGHT = 0.5
+
+# Puntuaciones decaídas por debajo de esto se olvidan al persistir
+MIN_SCORE = 0.01
+
+# (puntuación, parte de likes, instante)
+Entry = Tuple[float, float, float]
+
+
+def _entry(values: list) -> Entry:
+    if len(values) == 2:
+        # Fichero anterior a separar los likes
+        s, t = values
+        return (s, 0.0, t)
+    s, l, t = values
+    return (s, l, t)
+
+
+class TrendingEngine:
+    """
+    Puntuación por producto con decaimiento exponencial (vida media TRENDING_HALF_LIFE).
+
+    Cada producto guarda (s, l, t): puntuación lineal s en el instante t, de la que l viene
+    de likes. Decaer todo a la vez no cambia el orden, así que se ordena por la clave
+    invariante log2(s) + t/vida_media y el top-K solo se toca cuando llega un evento, nunca
+    por el paso del tiempo.
+
+    Retirar un like resta LIKE_WEIGHT solo de la parte l, que no baja de cero: el like
+    original puede haber decaído ya, y lo que sobre no debe comerse compras ni clics.
+
+    Cada worker acumula sus eventos en `_pending` y los fusiona periódicamente en un
+    fichero común (con flock); tras fusionar adopta el estado del fichero, de modo que
+    todos los workers convergen a la misma clasificación.
+
+    Las peticiones nunca recorren todas las puntuaciones: si un producto sale del top
+    (borrado, like retirado) el hueco se rellena en la siguiente persistencia, y mientras
+    tanto se sirve la clasificación anterior.
+    """
+
+    def __init__(self, half_life: float, k: int, path: str):
+        self.half_life = half_life
+        self.k = k
+        self.path = path
+        self._scores: Dict[int, Entry] = {}
+        self._pending: Dict[int, Entry] = {}
+        self._removed = set()
+        self._top: Dict[int, float] = {}
+        self._ranking: List[Tuple[int, Entry]] = []
+        self._ranking_stale = True
+        self._lock = threading.Lock()
+        self.events = 0
+        self.persists = 0
+
+    # --- Aritmética de puntuaciones ---------------------------------------------------
+
+    def _decay(self, entry: Entry, now: float) -> Tuple[float, float]:
+        s, l, t = entry
+        factor = 2 ** (-(now - t) / self.half_life)
+        return s * factor, l * factor
+
+    def _merge(self, a: Entry, b: Entry) -> Entry:
+        """Suma tal cual: para deltas pendientes, que pueden llevar likes negativos."""
+        now = max(a[2], b[2])
+        (sa, la), (sb, lb) = self._decay(a, now), self._decay(b, now)
+        return (sa + sb, la + lb, now)
+
+    def _apply(self, base: Optional[Entry], delta: Entry) -> Entry:
+        """Aplica un delta a una puntuación: la parte de likes se queda en cero como mínimo."""
+        if base is None:
+            base = (0.0, 0.0, delta[2])
+        now = max(base[2], delta[2])
+        (s, l), (ds, dl) = self._decay(base, now), self._decay(delta, now)
+        likes = max(l + dl, 0.0)
+        return ((s - l) + (ds - dl) + likes, likes, now)
+
+    def _key(self, entry: Entry) -> float:
+        return math.log2(entry[0]) + entry[2] / self.half_life
+
+    # --- Top-K -----------------------------------------------------------------------------
+
+    def _update_top(self, product_id: int) -> None:
+        entry = self._scores.get(product_id)
+        if entry is None or entry[0] <= 0:
+            # El hueco (el siguiente mejor puede estar en cualquier parte) lo rellena _adopt
+            if self._top.pop(product_id, None) is not None:
+                self._ranking_stale = True
+            return
+        key = self._key(entry)
+        if product_id in self._top:
+            self._top[product_id] = key
+        elif len(self._top) < self.k:
+            self._top[product_id] = key
+        else:
+            weakest = min(self._top, key=self._top.get)
+            if key > self._top[weakest]:
+                del self._top[weakest]
+                self._top[product_id] = key
+        self._ranking_stale = True
+
+    def _candidates(self, scores: Dict[int, Entry], n: int) -> List[int]:
+        return heapq.nlargest(n, scores, key=lambda pid: self._key(scores[pid]))
+
+    # --- Eventos -------------------------------------------------------------------------
+
+    def record(self, product_id: int, weight: float, now: Optional[float] = None, like: bool = False) -> None:
+        now = now or time.time()
+        delta = (weight, weight if like else 0.0, now)
+        with self._lock:
+            entry = self._apply(self._scores.get(product_id), delta)
+            if entry[0] <= 0:
+                self._scores.pop(product_id, None)
+            else:
+                self._scores[product_id] = entry
+            pending = self._pending.get(product_id)
+            self._pending[product_id] = self._merge(pending, delta) if pending else delta
+            self._update_top(product_id)
+            self.events += 1
+
+    def discard(self, product_id: int) -> None:
+        """Producto borrado: fuera del ranking aquí y, al persistir, en el fichero común."""
+        with self._lock:
+            self._scores.pop(product_id, None)
+            self._pending.pop(product_id, None)
+            self._removed.add(product_id)
+            self._update_top(product_id)
+
+    # --- Lectura ---------------------------------------------------------------------------
+
+    def top(self, limit: int, now: Optional[float] = None) -> List[dict]:
+        """Los `limit` primeros (limit <= K) con su puntuación decaída a `now`. Coste O(limit)."""
+        now = now or time.time()
+        with self._lock:
+            if self._ranking_stale:
+                ordered = sorted(self._top, key=self._top.get, reverse=True)
+                self._ranking = [(pid, self._scores[pid]) for pid in ordered]
+                self._ranking_stale = False
+            ranking = self._ranking
+        return [
+            {"product_id": pid, "score": round(self._decay(entry, now)[0], 4)}
+            for pid, entry in ranking[:limit]
+        ]
+
+    # --- Persistencia ----------------------------------------------------------------------
+
+    def _read_file(self) -> Dict[int, Entry]:
+        try:
+            with open(self.path) as f:
+                return {int(pid): _entry(values) for pid, values in json.load(f)["scores"].items()}
+        except (FileNotFoundError, ValueError, KeyError):
+            return {}
+
+    def persist(self, now: Optional[float] = None) -> int:
+        """Fusiona los eventos pendientes en el fichero común y adopta el resultado."""
+        now = now or time.time()
+        with self._lock:
+            pending, removed = self._pending, self._removed
+            self._pending, self._removed = {}, set()
+
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = self._read_file()
+            for pid in removed:
+                merged.pop(pid, None)
+            for pid, entry in pending.items():
+                merged[pid] = self._apply(merged.get(pid), entry)
+            merged = self._write_file(merged, now)
+        self._adopt(merged)
+        self.persists += 1
+        return len(merged)
+
+    def replace(self, events: Iterable[Tuple[int, float, float]], now: Optional[float] = None) -> int:
+        """Reemplaza el fichero común por las puntuaciones de (product_id, peso, timestamp)."""
+        now = now or time.time()
+        scores: Dict[int, Entry] = {}
+        for pid, weight, ts in events:
+            entry = (weight, 0.0, ts)
+            scores[pid] = self._merge(scores[pid], entry) if pid in scores else entry
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            scores = self._write_file(scores, now)
+        self._adopt(scores)
+        return len(scores)
+
+    def _write_file(self, scores: Dict[int, Entry], now: float) -> Dict[int, Entry]:
+        # Se llama con el flock tomado; el rename deja el fichero siempre completo para los lectores
+        decayed = {pid: self._decay(entry, now) for pid, entry in scores.items()}
+        scores = {pid: (s, l, now) for pid, (s, l) in decayed.items() if s >= MIN_SCORE}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"scores": {str(pid): list(entry) for pid, entry in scores.items()}}, f)
+        os.replace(tmp_path, self.path)
+        return scores
+
+    def _adopt(self, scores: Dict[int, Entry]) -> None:
+        """
+        Sustituye las puntuaciones por `scores` (el fichero, todas > 0) más lo pendiente.
+        El recorrido O(N log K) se hace fuera del lock, en el hilo del persister: los
+        K + holgura mejores del fichero contienen el top-K final mientras lo llegado
+        entretanto (pendiente o borrado) no pase de la holgura.
+        """
+        slack = self.k
+        candidates = self._candidates(scores, self.k + slack)
+        with self._lock:
+            # Lo que llegó mientras escribíamos sigue pendiente y se suma encima
+            touched = set(self._pending) | self._removed
+            for pid, entry in self._pending.items():
+                merged = self._apply(scores.get(pid), entry)
+                if merged[0] > 0:
+                    scores[pid] = merged
+                else:
+                    scores.pop(pid, None)
+            for pid in self._removed:
+                scores.pop(pid, None)
+            self._scores = scores
+            if len(touched) > slack:
+                # Ráfaga mayor que la holgura: recorrido completo, también fuera de las peticiones
+                candidates = self._candidates(scores, self.k)
+            pool = {pid for pid in candidates if pid not in touched} | {pid for pid in touched if pid in scores}
+            self._top = {pid: self._key(scores[pid]) for pid in self._candidates({pid: scores[pid] for pid in pool}, self.k)}
+            self._ranking_stale = True
+
+    def load(self) -> None:
+        self._adopt(self._read_file())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "products": len(self._scores),
+                "top_k": len(self._top),
+                "pending": len(self._pending),
+                "events": self.events,
+                "persists": self.persists,
+            }
+
+
+trending = TrendingEngine(half_life=TRENDING_HALF_LIFE, k=TRENDING_K, path=TRENDING_PATH)
+trending_persister = PeriodicTask("trending-persist", TRENDING_PERSIST_INTERVAL, trending.persist)
@@ -0,0 +1,86 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+from sqlmodel import Session, select
+from app import database
+from app.database import dialect_insert
+from app.models.versions import CacheVersion
+
+# Listados de productos (altas y bajas). Los likes no la suben: sería una fila caliente
+# que además invalidaría todos los ETag de /products con cada like.
+PRODUCTS_VERSION = "products"
+# like_count de otros usuarios puede llegar con este retraso máximo (segundos) en respuestas con ETag
+LIKE_COUNT_MAX_AGE = float(os.getenv("LIKE_COUNT_MAX_AGE", "30"))
+
+
+def user_version(user_id: Optional[int]) -> Optional[str]:
+    """
+    Todo lo que muestra /users/me de ese usuario (perfil, saldo, carrito, likes, compras).
+    None sin usuario (p. ej. un producto sin dueño): bump_versions lo ignora.
+    """
+    return f"user:{user_id}" if user_id is not None else None
+
+
+def product_links_version(product_id: int) -> str:
+    """Links de afiliado activos de un producto (GET /affiliates/product/{id})."""
+    return f"affiliates:product:{product_id}"
+
+
+def like_count_epoch() -> int:
+    """
+    Ventana de LIKE_COUNT_MAX_AGE segundos para los ETag que muestran like_count.
+    Los likes solo suben la versión de quien da el like y del dueño; los demás ven
+    el contador nuevo, como tarde, al cambiar de ventana.
+    """
+    return int(time.time() // LIKE_COUNT_MAX_AGE)
+
+
+def bump_version(session: Session, name: str) -> int:
+    """
+    Incrementa la versión de `name` dentro de la transacción actual y devuelve la nueva.
+    Upsert atómico: dos primeras subidas simultáneas del mismo nombre no chocan.
+    """
+    statement = dialect_insert(session, CacheVersion).values(name=name, version=1)
+    return session.exec(
+        statement
+        .on_conflict_do_update(index_elements=["name"], set_={"version": CacheVersion.version + 1})
+        .returning(CacheVersion.version)
+    ).scalar_one()
+
+
+def bump_versions(session: Session, *names: Optional[str]) -> None:
+    # Siempre en el mismo orden: dos transacciones no se bloquean en orden cruzado
+    for name in sorted({name for name in names if name is not None}):
+        bump_version(session, name)
+
+
+def read_versions(session: Session, names: Iterable[str]) -> Dict[str, int]:
+    names = list(names)
+    found = dict(session.exec(select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.in_(names))).all())
+    return {name: found.get(name, 0) for name in names}
+
+
+class VersionWatcher:
+    """
+    Llama a `on_change` cuando la versión de `name` en BD cambia: así una invalidación
+    hecha en otro worker llega a la caché en memoria de este. Pensado para un PeriodicTask.
+    """
+
+    def __init__(self, name: str, on_change: Callable[[], None]):
+        self.name = name
+        self.on_change = on_change
+        self.version: Optional[int] = None
+        self.changes = 0
+
+    def check(self) -> bool:
+        with Session(database.engine) as session:
+            version = read_versions(session, [self.name])[self.name]
+        if version == self.version:
+            return False
+        self.on_change()
+        self.version = version
+        self.changes += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"version": self.version, "changes": self.changes}
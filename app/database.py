@@ -1,25 +1,126 @@
 import os
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models import User, Product, Comment, ProductLike
+from app.core.pool_metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool, instrument_engine
 
 load_dotenv()
 
 # Asegúrate de tener DATABASE_URL en tu archivo .env
 sqlite_url = os.getenv("DATABASE_URL")
 
-# El echo=True sirve para ver en consola todas las consultas SQL que se ejecutan (útil para aprender)
-engine = create_engine(
-    sqlite_url, 
-    echo=True,
-    pool_pre_ping=True,  # Verifica si la conexión está viva antes de usarla
-    connect_args={"connect_timeout": 10} # Da un poco más de tiempo para conectar
-)
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+# DB_ASYNC=true activa el motor asíncrono (psycopg3) para los endpoints de lectura más usados
+DB_ASYNC = _env_flag("DB_ASYNC", False)
+
+
+def engine_options(url: str, async_engine: bool = False) -> dict:
+    """
+    Perfil del motor configurable por entorno. Por defecto pensado para producción:
+    sin echo de SQL y sin pre-ping (pool_recycle se encarga de las conexiones viejas).
+    """
+    options = {
+        # DB_ECHO=true vuelve a imprimir cada consulta SQL (útil para aprender/depurar)
+        "echo": _env_flag("DB_ECHO", False),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", False),
+    }
+
+    if url.startswith("sqlite") and ":memory:" in url:
+        return options
+
+    options.update({
+        "poolclass": TimedAsyncAdaptedQueuePool if async_engine else TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # Neon/Render cierran conexiones inactivas: las reciclamos antes de que caduquen
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+    })
+
+    if url.startswith("postgres"):
+        connect_args = {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10"))}
+        statement_timeout = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+        if statement_timeout:
+            connect_args["options"] = f"-c statement_timeout={int(statement_timeout)}"
+        options["connect_args"] = connect_args
+    elif url.startswith("sqlite") and not async_engine:
+        # Las sesiones viajan entre hilos del threadpool de FastAPI
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+engine = create_engine(sqlite_url, **engine_options(sqlite_url))
+pool_metrics = instrument_engine(engine)
+
+
+def async_database_url(url: str) -> str:
+    """Traduce la URL síncrona al driver asíncrono equivalente."""
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+psycopg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+async_engine = None
+async_pool_metrics = None
+if DB_ASYNC:
+    async_url = async_database_url(sqlite_url)
+    async_engine = create_async_engine(async_url, **engine_options(async_url, async_engine=True))
+    async_pool_metrics = instrument_engine(async_engine)
 
 def create_db_and_tables():
+    from app.core.text_search import install_text_search
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        install_text_search(connection)
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+async def get_db():
+    """
+    Sesión para los endpoints async: AsyncSession si DB_ASYNC está activo,
+    Session síncrona en caso contrario. Úsala siempre a través de run_db().
+    """
+    if async_engine is not None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(engine) as session:
+            yield session
+
+async def run_db(session, fn, *args, **kwargs):
+    """
+    Ejecuta fn(session_sync, *args) sin bloquear el event loop: con el motor async
+    vía AsyncSession.run_sync (sin hilos), con el síncrono en el threadpool de anyio.
+    """
+    if isinstance(session, AsyncSession):
+        return await session.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, session, *args, **kwargs)
+
+def dialect_insert(session, model):
+    """
+    INSERT del dialecto de la sesión, con ON CONFLICT (on_conflict_do_nothing /
+    on_conflict_do_update). Postgres en producción, SQLite en desarrollo.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
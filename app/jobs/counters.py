@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlmodel import Session, select, func
+from app.core.counters import COUNTER_FIELDS, COUNTER_SHARDS
+from app.database import dialect_insert
+from app.models.interactions import Purchase
+from app.models.products import Product
+from app.models.stats import PlatformCounters
+from app.models.users import User
+
+
+def recount_platform_counters(session: Session, commit: bool = True) -> PlatformCounters:
+    """
+    Recalcula los contadores desde las tablas y deja los totales en el shard 0 (el resto
+    a cero). Bloquea antes los shards, en orden de id, para que los incrementos concurrentes
+    esperen y no se pierdan entre el recuento y la escritura. Devuelve el shard 0.
+    """
+    # Primero existen todos los shards: un incremento que crease uno nuevo durante el
+    # recuento no quedaría bloqueado y se contaría dos veces. Los que crea este INSERT
+    # también bloquean: el upsert concurrente espera a que terminemos
+    session.exec(
+        dialect_insert(session, PlatformCounters)
+        .values([{"id": shard, **{name: 0 for name in COUNTER_FIELDS}} for shard in range(COUNTER_SHARDS)])
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    shards = session.exec(select(PlatformCounters).order_by(PlatformCounters.id).with_for_update()).all()
+    counters = next((shard for shard in shards if shard.id == 0), None) or PlatformCounters(id=0)
+    for shard in shards:
+        if shard.id != 0:
+            for name in COUNTER_FIELDS:
+                setattr(shard, name, 0)
+            session.add(shard)
+
+    counters.total_users = session.exec(select(func.count(User.id))).one()
+    counters.total_products = session.exec(select(func.count(Product.id))).one()
+    counters.total_sales = session.exec(select(func.count(Purchase.id))).one()
+    counters.total_revenue = session.exec(
+        select(func.sum(Purchase.price_at_purchase * Purchase.quantity))
+    ).one() or 0
+    counters.recounted_at = datetime.utcnow()
+    session.add(counters)
+    if commit:
+        session.commit()
+        session.refresh(counters)
+    else:
+        session.flush()
+    return counters
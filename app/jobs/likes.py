@@ -0,0 +1,61 @@
+from typing import List, Tuple
+from sqlalchemy import update
+from sqlmodel import Session, select, func
+from app.models.products import Product
+from app.models.interactions import ProductLike
+from app.core.versions import PRODUCTS_VERSION, bump_versions
+
+
+def reconcile_like_counts(session: Session, batch_size: int = 1000, fix: bool = True) -> List[Tuple[int, int, int]]:
+    """
+    Compara Product.like_count con el COUNT real de productlike, por lotes de IDs.
+    Devuelve la lista de desvíos (product_id, guardado, real) y, si `fix`, los corrige
+    con un único UPDATE correlacionado por lote: el recuento se evalúa al escribir,
+    así un like que entra mientras tanto no se pierde.
+    """
+    actual_count = (
+        select(func.count(ProductLike.user_id))
+        .where(ProductLike.product_id == Product.id)
+        .correlate(Product)
+        .scalar_subquery()
+    )
+    drift = []
+    last_id = 0
+    while True:
+        stored = session.exec(
+            select(Product.id, Product.like_count)
+            .where(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(batch_size)
+        ).all()
+        if not stored:
+            break
+
+        ids = [pid for pid, _ in stored]
+        if fix:
+            corrected = session.exec(
+                update(Product)
+                .where(Product.id > last_id, Product.id <= ids[-1], Product.like_count != actual_count)
+                .values(like_count=actual_count)
+                .returning(Product.id, Product.like_count)
+            ).all()
+            stored_counts = dict(stored)
+            batch_drift = [(pid, stored_counts.get(pid), real) for pid, real in corrected]
+            if batch_drift:
+                bump_versions(session, PRODUCTS_VERSION)
+            session.commit()
+        else:
+            actual = dict(session.exec(
+                select(ProductLike.product_id, func.count(ProductLike.user_id))
+                .where(ProductLike.product_id.in_(ids))
+                .group_by(ProductLike.product_id)
+            ).all())
+            batch_drift = [
+                (pid, count, actual.get(pid, 0))
+                for pid, count in stored
+                if count != actual.get(pid, 0)
+            ]
+
+        drift.extend(batch_drift)
+        last_id = ids[-1]
+    return drift
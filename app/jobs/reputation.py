@@ -0,0 +1,64 @@
+from typing import List, Tuple
+from sqlalchemy import update
+from sqlmodel import Session, select, func
+from app.models.interactions import ProductLike
+from app.models.products import Product
+from app.models.users import User
+from app.core.versions import bump_versions, user_version
+
+
+def reconcile_reputation(session: Session, batch_size: int = 1000, fix: bool = True) -> List[Tuple[int, int, int]]:
+    """
+    Compara User.reputation con los likes reales recibidos en sus productos, por lotes
+    de IDs. Devuelve los desvíos (user_id, guardado, real) y, si `fix`, los corrige con
+    un único UPDATE correlacionado por lote: el recuento se evalúa al escribir, así un
+    like que entra mientras tanto no se pierde.
+    """
+    actual_reputation = (
+        select(func.count(ProductLike.user_id))
+        .join(Product, Product.id == ProductLike.product_id)
+        .where(Product.owner_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    drift = []
+    last_id = 0
+    while True:
+        stored = session.exec(
+            select(User.id, User.reputation)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not stored:
+            break
+
+        ids = [uid for uid, _ in stored]
+        if fix:
+            corrected = session.exec(
+                update(User)
+                .where(User.id > last_id, User.id <= ids[-1], User.reputation != actual_reputation)
+                .values(reputation=actual_reputation)
+                .returning(User.id, User.reputation)
+            ).all()
+            stored_reputation = dict(stored)
+            batch_drift = [(uid, stored_reputation.get(uid), real) for uid, real in corrected]
+            if batch_drift:
+                bump_versions(session, *[user_version(uid) for uid, _, _ in batch_drift])
+            session.commit()
+        else:
+            actual = dict(session.exec(
+                select(Product.owner_id, func.count(ProductLike.user_id))
+                .join(ProductLike, ProductLike.product_id == Product.id)
+                .where(Product.owner_id.in_(ids))
+                .group_by(Product.owner_id)
+            ).all())
+            batch_drift = [
+                (uid, reputation, actual.get(uid, 0))
+                for uid, reputation in stored
+                if reputation != actual.get(uid, 0)
+            ]
+
+        drift.extend(batch_drift)
+        last_id = ids[-1]
+    return drift
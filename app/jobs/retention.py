@@ -0,0 +1,202 @@
+import csv
+import gzip
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import delete, func, text
+from sqlmodel import Session, select
+from app.models.affiliates import ClickEvent, ClickRollup
+from app.jobs.clicks import ROLLUP_WATERMARK, compact_clicks, merge_into_rollups, _aggregate
+from app.jobs.watermarks import advance_watermark, lock_watermark
+
+CLICK_ARCHIVE_DIR = os.getenv("CLICK_ARCHIVE_DIR", "archives/clicks")
+CLICK_RETENTION_MONTHS = int(os.getenv("CLICK_RETENTION_MONTHS", "6"))
+
+DEFAULT_PARTITION = "clickevent_default"
+ARCHIVE_COLUMNS = ["id", "link_id", "user_id", "referrer", "created_at"]
+DELETE_BATCH_SIZE = 5000
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"clickevent_p{month:%Y_%m}"
+
+
+def is_partitioned(session: Session) -> bool:
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    return session.exec(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'clickevent'::regclass")
+    ).first() is not None
+
+
+def _partition_exists(session: Session, name: str) -> bool:
+    return session.exec(text("SELECT to_regclass(:name)"), params={"name": name}).scalar() is not None
+
+
+def ensure_click_partitions(session: Session, months_ahead: int = 2, now: Optional[datetime] = None) -> List[str]:
+    """
+    Crea (si faltan) las particiones mensuales del mes actual y los `months_ahead` siguientes.
+    Si la partición DEFAULT ya tiene clics de ese mes (p. ej. el proceso estuvo parado al
+    cambiar de mes), un CREATE ... PARTITION OF fallaría: la tabla se crea suelta, se le
+    mueven esas filas y después se adjunta, todo en la misma transacción.
+    """
+    if not is_partitioned(session):
+        return []
+    created = []
+    columns = ", ".join(c.name for c in ClickEvent.__table__.columns)
+    current = month_start(now or datetime.utcnow())
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if _partition_exists(session, name):
+            continue
+        bounds = f"FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+        session.exec(text(f"CREATE TABLE {name} (LIKE clickevent INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        session.exec(text(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end "
+            f"RETURNING {columns}"
+            f") INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+        ), params={"start": month, "end": add_months(month, 1)})
+        session.exec(text(f"ALTER TABLE clickevent ATTACH PARTITION {name} FOR VALUES {bounds}"))
+        created.append(name)
+    session.commit()
+    return created
+
+
+def archive_path(archive_dir: str, month: datetime) -> str:
+    return os.path.join(archive_dir, f"clickevent_{month:%Y_%m}.csv.gz")
+
+
+def _export_month(session: Session, month: datetime, path: str) -> int:
+    """Vuelca el mes a CSV comprimido leyendo con cursor de servidor (memoria constante)."""
+    statement = (
+        select(ClickEvent.id, ClickEvent.link_id, ClickEvent.user_id, ClickEvent.referrer, ClickEvent.created_at)
+        .where(ClickEvent.created_at >= month, ClickEvent.created_at < add_months(month, 1))
+        .order_by(ClickEvent.id)
+        .execution_options(yield_per=DELETE_BATCH_SIZE)
+    )
+    rows = 0
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", newline="") as archive:
+        writer = csv.writer(archive)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for row in session.exec(statement):
+            writer.writerow([row[0], row[1], "" if row[2] is None else row[2], row[3] or "", row[4].isoformat()])
+            rows += 1
+    # Solo damos el archivo por bueno cuando está completo
+    os.replace(tmp_path, path)
+    return rows
+
+
+def _drop_month(session: Session, month: datetime) -> None:
+    name = partition_name(month)
+    if is_partitioned(session) and _partition_exists(session, name):
+        session.exec(text(f"ALTER TABLE clickevent DETACH PARTITION {name}"))
+        session.exec(text(f"DROP TABLE {name}"))
+        session.commit()
+        return
+
+    # Sin partición propia (SQLite, o filas en la partición DEFAULT): DELETE por lotes
+    while True:
+        ids = session.exec(
+            select(ClickEvent.id)
+            .where(ClickEvent.created_at >= month, ClickEvent.created_at < add_months(month, 1))
+            .limit(DELETE_BATCH_SIZE)
+        ).all()
+        if not ids:
+            return
+        session.exec(delete(ClickEvent).where(ClickEvent.id.in_(ids)))
+        session.commit()
+
+
+def archive_old_clicks(
+    session: Session,
+    horizon_months: int = CLICK_RETENTION_MONTHS,
+    archive_dir: str = CLICK_ARCHIVE_DIR,
+    now: Optional[datetime] = None,
+) -> List[Tuple[str, int]]:
+    """
+    Exporta a `archive_dir` y elimina los meses de clics anteriores al horizonte.
+    Antes compacta los rollups para que ningún evento se archive sin estar agregado.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    compact_clicks(session, now=now)
+
+    cutoff = add_months(month_start(now or datetime.utcnow()), -horizon_months)
+    oldest = session.exec(select(func.min(ClickEvent.created_at)).where(ClickEvent.created_at < cutoff)).one()
+    watermark = lock_watermark(session, ROLLUP_WATERMARK).last_id
+    session.commit()
+
+    archived = []
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        max_id = session.exec(
+            select(func.max(ClickEvent.id))
+            .where(ClickEvent.created_at >= month, ClickEvent.created_at < add_months(month, 1))
+        ).one()
+        if max_id is not None:
+            if max_id > watermark:
+                # Aún sin compactar (p. ej. clics insertados tarde): lo dejamos para otra pasada
+                break
+            path = archive_path(archive_dir, month)
+            rows = _export_month(session, month, path)
+            _drop_month(session, month)
+            archived.append((path, rows))
+        month = add_months(month, 1)
+    return archived
+
+
+def iter_archived_clicks(archive_dir: str = CLICK_ARCHIVE_DIR) -> Iterator[Tuple[int, int, Optional[int], Optional[str], datetime]]:
+    """Recorre los archivos exportados, del mes más antiguo al más reciente."""
+    if not os.path.isdir(archive_dir):
+        return
+    for filename in sorted(os.listdir(archive_dir)):
+        if not (filename.startswith("clickevent_") and filename.endswith(".csv.gz")):
+            continue
+        with gzip.open(os.path.join(archive_dir, filename), "rt", newline="") as archive:
+            for row in csv.DictReader(archive):
+                yield (
+                    int(row["id"]),
+                    int(row["link_id"]),
+                    int(row["user_id"]) if row["user_id"] else None,
+                    row["referrer"] or None,
+                    datetime.fromisoformat(row["created_at"]),
+                )
+
+
+def rebuild_rollups(session: Session, archive_dir: str = CLICK_ARCHIVE_DIR, batch_size: int = 10000) -> int:
+    """
+    Reconstruye ClickRollup desde cero: primero reproduce los archivos y luego compacta
+    la tabla viva desde el principio. Devuelve cuántos eventos archivados se reprodujeron.
+    """
+    watermark = lock_watermark(session, ROLLUP_WATERMARK)
+    session.exec(delete(ClickRollup))
+    advance_watermark(session, watermark, 0)
+
+    replayed = 0
+    batch = []
+    for click_id, link_id, user_id, _, created_at in iter_archived_clicks(archive_dir):
+        batch.append((link_id, user_id, created_at))
+        if len(batch) >= batch_size:
+            merge_into_rollups(session, _aggregate(batch))
+            session.flush()
+            replayed += len(batch)
+            batch = []
+    if batch:
+        merge_into_rollups(session, _aggregate(batch))
+        replayed += len(batch)
+    session.commit()
+
+    # Los eventos archivados ya no están en la tabla viva: no se cuentan dos veces
+    compact_clicks(session, batch_size=batch_size)
+    return replayed
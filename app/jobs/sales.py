@@ -0,0 +1,147 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
+from app import database
+from app.core.periodic import PeriodicTask
+from app.models.categories import Category
+from app.models.interactions import Purchase
+from app.models.products import Product
+from app.models.reports import CategorySalesDaily
+from app.jobs.watermarks import advance_watermark, lock_watermark, read_watermark
+
+SALES_WATERMARK = "category_sales"
+
+# Igual que con los clics: margen para compras con ID menor que aún no han hecho COMMIT.
+# Se mide sobre inserted_at (hora del INSERT en la base), no sobre purchase_date, que la
+# app fija antes y puede quedar por detrás de la marca en una transacción lenta
+SAFETY_LAG = timedelta(minutes=2)
+# Cada worker lo lanza; la marca bloqueada con FOR UPDATE evita procesar dos veces un tramo.
+# Mantiene corta la cola de compras sin agregar que lee category_sales_report
+CATEGORY_SALES_REFRESH_INTERVAL = float(os.getenv("CATEGORY_SALES_REFRESH_INTERVAL", "60"))
+
+
+def _purchase_rows(*conditions):
+    """(categoría del producto, fecha, importe de la línea) de las compras que cumplen `conditions`."""
+    return (
+        select(Product.category_id, Purchase.purchase_date, Purchase.price_at_purchase * Purchase.quantity)
+        .join(Product, Product.id == Purchase.product_id)
+        .where(Product.category_id.is_not(None), *conditions)
+    )
+
+
+def _aggregate(rows: Iterable) -> Dict[tuple, list]:
+    """(category_id, día) -> [ventas, ingresos]"""
+    buckets = defaultdict(lambda: [0, 0.0])
+    for category_id, purchased_at, amount in rows:
+        bucket = buckets[(category_id, purchased_at.date())]
+        bucket[0] += 1
+        bucket[1] += amount
+    return buckets
+
+
+def _merge_into_summary(session: Session, buckets: Dict[tuple, list]) -> None:
+    if not buckets:
+        return
+    existing = {
+        (r.category_id, r.day): r
+        for r in session.exec(
+            select(CategorySalesDaily).where(
+                tuple_(CategorySalesDaily.category_id, CategorySalesDaily.day).in_(list(buckets))
+            )
+        ).all()
+    }
+    for (category_id, day), (sales, revenue) in buckets.items():
+        row = existing.get((category_id, day)) or CategorySalesDaily(category_id=category_id, day=day)
+        row.sales += sales
+        row.revenue += revenue
+        session.add(row)
+
+
+def refresh_category_sales(session: Session, batch_size: int = 10000, now: Optional[datetime] = None) -> int:
+    """
+    Agrega en CategorySalesDaily las compras con id > marca, por lotes, y avanza la marca
+    en la misma transacción. Devuelve cuántas compras se procesaron.
+    """
+    cutoff = (now or datetime.utcnow()) - SAFETY_LAG
+    processed = 0
+    while True:
+        watermark = lock_watermark(session, SALES_WATERMARK)
+        rows = session.exec(
+            select(Purchase.id, Purchase.inserted_at)
+            .where(Purchase.id > watermark.last_id)
+            .order_by(Purchase.id)
+            .limit(batch_size)
+        ).all()
+
+        # Paramos en la primera compra insertada demasiado recientemente
+        ready = []
+        for row in rows:
+            if row[1] >= cutoff:
+                break
+            ready.append(row[0])
+        if not ready:
+            session.rollback()
+            return processed
+
+        batch = session.exec(_purchase_rows(Purchase.id >= ready[0], Purchase.id <= ready[-1])).all()
+        _merge_into_summary(session, _aggregate(batch))
+        advance_watermark(session, watermark, ready[-1])
+        session.commit()
+        processed += len(ready)
+        if len(ready) < len(rows) or len(rows) < batch_size:
+            return processed
+
+
+def refresh_category_sales_job() -> int:
+    with Session(database.engine) as session:
+        return refresh_category_sales(session)
+
+
+category_sales_refresher = PeriodicTask(
+    "category-sales-refresh", CATEGORY_SALES_REFRESH_INTERVAL, refresh_category_sales_job
+)
+
+
+def category_sales_report(
+    session: Session,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    top: Optional[int] = None,
+) -> List[dict]:
+    """
+    Ventas por categoría en [since, until] (días inclusivos): resumen diario ya agregado
+    + la cola de compras posteriores a la marca. El coste depende de días y categorías.
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+
+    summary = select(CategorySalesDaily.category_id, CategorySalesDaily.sales, CategorySalesDaily.revenue)
+    if since:
+        summary = summary.where(CategorySalesDaily.day >= since)
+    if until:
+        summary = summary.where(CategorySalesDaily.day <= until)
+    for category_id, sales, revenue in session.exec(summary).all():
+        totals[category_id][0] += sales
+        totals[category_id][1] += revenue
+
+    tail = _purchase_rows(Purchase.id > read_watermark(session, SALES_WATERMARK))
+    if since:
+        tail = tail.where(Purchase.purchase_date >= datetime.combine(since, datetime.min.time()))
+    if until:
+        tail = tail.where(Purchase.purchase_date < datetime.combine(until + timedelta(days=1), datetime.min.time()))
+    for (category_id, _), (sales, revenue) in _aggregate(session.exec(tail).all()).items():
+        totals[category_id][0] += sales
+        totals[category_id][1] += revenue
+
+    ranked = sorted(totals.items(), key=lambda item: (-item[1][0], item[0]))
+    if top is not None:
+        ranked = ranked[:top]
+    names = dict(session.exec(
+        select(Category.id, Category.name).where(Category.id.in_([category_id for category_id, _ in ranked]))
+    ).all()) if ranked else {}
+    return [
+        {"category": names.get(category_id), "sales": sales, "revenue": revenue}
+        for category_id, (sales, revenue) in ranked
+    ]
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Tuple
+from sqlmodel import Session, select
+from app.core.trending import CLICK_WEIGHT, PURCHASE_WEIGHT, TrendingEngine
+from app.models.affiliates import AffiliateLink, ClickEvent
+from app.models.interactions import Purchase
+
+
+def _timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _history(session: Session, since: datetime, batch_size: int) -> Iterator[Tuple[int, float, float]]:
+    purchases = session.exec(
+        select(Purchase.product_id, Purchase.quantity, Purchase.purchase_date)
+        .where(Purchase.purchase_date >= since)
+        .execution_options(yield_per=batch_size)
+    )
+    for product_id, quantity, purchased_at in purchases:
+        yield product_id, PURCHASE_WEIGHT * quantity, _timestamp(purchased_at)
+
+    clicks = session.exec(
+        select(AffiliateLink.product_id, ClickEvent.created_at)
+        .join(AffiliateLink, AffiliateLink.id == ClickEvent.link_id)
+        .where(ClickEvent.created_at >= since)
+        .execution_options(yield_per=batch_size)
+    )
+    for product_id, clicked_at in clicks:
+        yield product_id, CLICK_WEIGHT, _timestamp(clicked_at)
+
+
+def rebuild_trending(session: Session, engine: TrendingEngine, days: int = 7, batch_size: int = 10000) -> int:
+    """
+    Reconstruye el ranking desde las compras y los clics de los últimos `days` días.
+    ProductLike no guarda fecha, así que los likes solo entran por los eventos en vivo.
+    Devuelve cuántos productos quedan puntuados.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    return engine.replace(_history(session, since, batch_size))
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlmodel import Session, select
+from app.models.jobs import JobWatermark
+
+
+def lock_watermark(session: Session, name: str) -> JobWatermark:
+    """
+    Devuelve (creándola si hace falta) la marca del job, bloqueada con FOR UPDATE
+    para que dos ejecuciones simultáneas no procesen el mismo tramo.
+    """
+    watermark = session.exec(
+        select(JobWatermark).where(JobWatermark.name == name).with_for_update()
+    ).first()
+    if watermark is None:
+        watermark = JobWatermark(name=name, last_id=0)
+        session.add(watermark)
+        session.flush()
+    return watermark
+
+
+def read_watermark(session: Session, name: str) -> int:
+    last_id = session.exec(select(JobWatermark.last_id).where(JobWatermark.name == name)).first()
+    return last_id or 0
+
+
+def advance_watermark(session: Session, watermark: JobWatermark, last_id: int) -> None:
+    watermark.last_id = last_id
+    watermark.updated_at = datetime.utcnow()
+    session.add(watermark)
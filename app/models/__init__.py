@@ -1,8 +1,13 @@
 from .interactions import ProductLike
 from .users import User
 from .products import Product, Comment
-from .affiliates import AffiliateLink, ClickEvent
+from .affiliates import AffiliateLink, ClickEvent, ClickRollup
 from .categories import Category
+from .jobs import JobWatermark
+from .idempotency import IdempotencyKey
+from .stats import PlatformCounters
+from .reports import CategorySalesDaily
+from .versions import CacheVersion
 
 # Rebuild internal SQLModel relations
 User.model_rebuild()
@@ -11,5 +16,5 @@ Comment.model_rebuild()
 AffiliateLink.model_rebuild()
 Category.model_rebuild()
 
-__all__ = ["User", "Product", "Comment", "ProductLike", "AffiliateLink", "ClickEvent", "Category"]
+__all__ = ["User", "Product", "Comment", "ProductLike", "AffiliateLink", "ClickEvent", "ClickRollup", "Category", "JobWatermark", "IdempotencyKey", "PlatformCounters", "CategorySalesDaily", "CacheVersion"]
 
@@ -1,5 +1,8 @@
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import Column, DateTime, Index
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from sqlmodel import SQLModel, Field, Relationship
 
 # Importación para el tipado sin causar círculos
@@ -7,6 +10,23 @@ if TYPE_CHECKING:
     from .products import Product
     from .users import User
 
+class utcnow(FunctionElement):
+    """Hora UTC del servidor de base de datos (naive, como el resto de columnas datetime)."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite: CURRENT_TIMESTAMP ya es UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
 class AffiliateLinkBase(SQLModel):
     platform_name: str
     url: str
@@ -21,11 +41,32 @@ class AffiliateLink(AffiliateLinkBase, table=True):
     clicks: List["ClickEvent"] = Relationship(back_populates="affiliate_link")
 
 class ClickEvent(SQLModel, table=True):
+    # Analíticas por link y rango de fechas; created_at solo para el archivado por meses
+    # (en Postgres la tabla está particionada por mes, ver app/jobs/retention.py)
+    __table_args__ = (
+        Index("ix_clickevent_link_id_created_at", "link_id", "created_at"),
+        Index("ix_clickevent_created_at", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     link_id: int = Field(foreign_key="affiliatelink.id")
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     referrer: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Momento del INSERT según la base de datos (created_at es cuando se encoló el clic):
+    # la compactación espera a que los lotes en vuelo hayan hecho COMMIT (ver app/jobs/clicks.py)
+    inserted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=False, server_default=utcnow()),
+    )
 
     affiliate_link: AffiliateLink = Relationship(back_populates="clicks")
 
+
+class ClickRollup(SQLModel, table=True):
+    # Clics agregados por link y hora (bucket_start truncado a la hora, UTC)
+    link_id: int = Field(foreign_key="affiliatelink.id", primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+    clicks: int = Field(default=0)
+    # Sketch HyperLogLog de user_id para usuarios únicos aproximados
+    users_sketch: bytes
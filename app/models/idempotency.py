@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class IdempotencyKey(SQLModel, table=True):
+    # sha256(alcance + Idempotency-Key): clave de tamaño fijo, sin importar lo que mande el cliente
+    key_hash: bytes = Field(primary_key=True)
+    # sha256 de método, ruta y query: detecta la misma clave reutilizada con otra petición
+    fingerprint: bytes
+    status_code: int = Field(default=200)
+    response: str  # cuerpo JSON de la respuesta original
+    expires_at: datetime = Field(index=True)
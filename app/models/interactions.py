@@ -1,7 +1,8 @@
 from sqlmodel import SQLModel, Field
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Column, DateTime, UniqueConstraint
 from typing import Optional
 from datetime import datetime
+from .affiliates import utcnow
 
 
 class ProductLike(SQLModel, table=True):
@@ -21,4 +22,12 @@ class Purchase(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     product_id: int = Field(foreign_key="product.id")
     purchase_date: datetime = Field(default_factory=datetime.utcnow)
+    # Precio unitario; el importe de la línea es price_at_purchase * quantity
     price_at_purchase: float = Field()
+    quantity: int = Field(default=1)
+    # Momento del INSERT según la base de datos (purchase_date lo pone la app antes del COMMIT):
+    # el resumen por categorías espera a que las compras en vuelo hayan hecho COMMIT (ver app/jobs/sales.py)
+    inserted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, nullable=False, server_default=utcnow()),
+    )
@@ -0,0 +1,9 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class JobWatermark(SQLModel, table=True):
+    # Último ID procesado por cada job incremental (rollups, reportes, ...)
+    name: str = Field(primary_key=True)
+    last_id: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
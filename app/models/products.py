@@ -1,6 +1,7 @@
 from typing import Optional, List, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
 from datetime import datetime
+from sqlalchemy import Index
 
 # Importamos las clases de enlace y relación
 from .interactions import ProductLike
@@ -12,6 +13,12 @@ if TYPE_CHECKING:
     from .users import User
 
 class Product(SQLModel, table=True):
+    # Índices compuestos para la paginación por cursor (keyset)
+    __table_args__ = (
+        Index("ix_product_created_at_id", "created_at", "id"),
+        Index("ix_product_price_id", "price", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: str
@@ -25,9 +32,12 @@ class Product(SQLModel, table=True):
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    # Contador desnormalizado, mantenido por los endpoints de like (ver app/core/likes.py)
+    like_count: int = Field(default=0)
+
     @property
     def likes_count(self) -> int:
-        return len(self.favorited_by)
+        return self.like_count
 
     # Relación con el dueño
     owner_id: int = Field(foreign_key="user.id")
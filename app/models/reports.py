@@ -0,0 +1,10 @@
+from datetime import date
+from sqlmodel import SQLModel, Field
+
+
+class CategorySalesDaily(SQLModel, table=True):
+    # Ventas agregadas por categoría y día (UTC), mantenidas por app/jobs/sales.py
+    category_id: int = Field(foreign_key="category.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    sales: int = Field(default=0)
+    revenue: float = Field(default=0)
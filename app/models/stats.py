@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class PlatformCounters(SQLModel, table=True):
+    # Totales del dashboard repartidos en shards (id = nº de shard; se suman al leer),
+    # mantenidos en las mismas transacciones que registran usuarios, productos y compras
+    # (ver app/core/counters.py)
+    __tablename__ = "platform_counters"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    total_users: int = Field(default=0)
+    total_products: int = Field(default=0)
+    total_sales: int = Field(default=0)
+    total_revenue: float = Field(default=0)
+    recounted_at: Optional[datetime] = None
@@ -0,0 +1,8 @@
+from sqlmodel import SQLModel, Field
+
+
+class CacheVersion(SQLModel, table=True):
+    # Contador por recurso ("categories", ...) que se incrementa en cada escritura:
+    # los workers lo comparan con el suyo para saber si su copia en memoria caducó
+    name: str = Field(primary_key=True)
+    version: int = Field(default=0)
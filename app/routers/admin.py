@@ -1,12 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from sqlalchemy import update
 from sqlmodel import Session, select, func
-from typing import List
+from typing import List, Literal, Optional
+from fastapi.responses import StreamingResponse
+from app import database
 from app.database import get_session
 from app.models.users import User
-from app.models.products import Product
 from app.models.interactions import Purchase
 from app.schemas.users import UserPublic
-from app.core.security import get_current_admin_user
+from app.core.security import get_current_admin_user, invalidate_cached_user
+from app.core.cache import caches
+from app.core.auth_utils import hashing_stats
+from app.core.click_buffer import click_buffer
+from app.core.catalog import catalog_poller, category_catalog
+from app.core.response_cache import response_cache
+from app.core.trending import trending, trending_persister
+from app.core.export import EXPORT_FORMATS, stream_export
+from app.core.idempotency import IdempotentRequest, idempotency_sweeper
+from app.core.counters import COUNTER_FIELDS, read_counters
+from app.core.versions import bump_versions, user_version
+from app.jobs.clicks import click_compactor, compact_clicks
+from app.routers.affiliates import link_cache_poller, link_cache_watcher
+from app.jobs.counters import recount_platform_counters
+from app.jobs.sales import category_sales_refresher, category_sales_report, refresh_category_sales
+from app.jobs.trending import rebuild_trending
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -15,21 +33,28 @@ def get_admin_stats(
     admin: User = Depends(get_current_admin_user), 
     session: Session = Depends(get_session)
 ):
-    # Contamos todo para el dashboard
-    total_users = session.exec(select(func.count(User.id))).one()
-    total_products = session.exec(select(func.count(Product.id))).one()
-    total_sales = session.exec(select(func.count(Purchase.id))).one()
-    
-    # Sumamos todo el dinero que se ha movido en compras
-    # (Usamos el precio guardado en el momento de la compra)
-    revenue = session.exec(select(func.sum(Purchase.price_at_purchase))).one() or 0
+    # Los totales se mantienen al escribir: el dashboard suma los shards en una consulta
+    counters = read_counters(session)
+    if counters is None:
+        counters = recount_platform_counters(session).model_dump(include=set(COUNTER_FIELDS))
+    return counters
 
-    return {
-        "total_users": total_users,
-        "total_products": total_products,
-        "total_sales": total_sales,
-        "total_revenue": revenue
-    }
+@router.get("/metrics")
+def get_metrics(admin: User = Depends(get_current_admin_user)):
+    # Telemetría del pool de este worker: sirve para dimensionar pool_size por worker de gunicorn
+    metrics = {"db_pool": database.pool_metrics.snapshot(database.engine.pool)}
+    if database.async_engine is not None:
+        metrics["db_async_pool"] = database.async_pool_metrics.snapshot(database.async_engine.sync_engine.pool)
+    metrics["caches"] = {name: cache.stats() for name, cache in caches.items()}
+    metrics["response_cache"] = response_cache.stats()
+    metrics["password_hashing"] = hashing_stats()
+    metrics["click_buffer"] = {**click_buffer.stats(), "compactor": click_compactor.stats()}
+    metrics["idempotency_sweeper"] = idempotency_sweeper.stats()
+    metrics["category_sales_refresher"] = category_sales_refresher.stats()
+    metrics["category_catalog"] = {**category_catalog.stats(), "poller": catalog_poller.stats()}
+    metrics["affiliate_link_cache"] = {**link_cache_watcher.stats(), "poller": link_cache_poller.stats()}
+    metrics["trending"] = {**trending.stats(), "persister": trending_persister.stats()}
+    return metrics
 
 @router.get("/users", response_model=List[UserPublic])
 def list_all_users(
@@ -41,48 +66,125 @@ def list_all_users(
     return users
 
 
+# Columnas de los volcados (sin hashed_password)
+USER_EXPORT_COLUMNS = (User.id, User.username, User.email, User.bio, User.profile_pic, User.website,
+                       User.balance, User.reputation, User.is_admin)
+PURCHASE_EXPORT_COLUMNS = (Purchase.id, Purchase.user_id, Purchase.product_id, Purchase.quantity,
+                           Purchase.price_at_purchase, Purchase.purchase_date)
+
+
+@router.get("/export/users")
+def export_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    admin: User = Depends(get_current_admin_user)
+):
+    # Volcado completo en streaming; /admin/users es para listados pequeños
+    return StreamingResponse(
+        stream_export(USER_EXPORT_COLUMNS, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
+@router.get("/export/purchases")
+def export_purchases(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_id: Optional[int] = None,
+    admin: User = Depends(get_current_admin_user)
+):
+    # Historial de compras, opcionalmente de un solo usuario
+    conditions = [Purchase.user_id == user_id] if user_id is not None else []
+    return StreamingResponse(
+        stream_export(PURCHASE_EXPORT_COLUMNS, format, *conditions),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="purchases.{format}"'},
+    )
+
+
 @router.get("/reports/categories")
 def get_category_report(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    top: Optional[int] = Query(default=None, ge=1, le=100),
     admin: User = Depends(get_current_admin_user), 
     session: Session = Depends(get_session)
 ):
-    # Esta consulta agrupa las compras por categoría y las cuenta
-    # Es como pasarle un escáner a todo el edificio para ver qué piso es más visitado
-    from app.models.products import Product
-    from app.models.categories import Category
-
-    statement = (
-        select(Category.name, func.count(Purchase.id).label("total_sales"))
-        .join(Product, Product.category_id == Category.id)
-        .join(Purchase, Purchase.product_id == Product.id)
-        .group_by(Category.name)
-        .order_by(func.count(Purchase.id).desc())
-    )
-    
-    results = session.exec(statement).all()
-    # Retornamos una lista de objetos simple
-    return [{"category": r[0], "sales": r[1]} for r in results]
+    # Se responde desde el resumen diario por categoría (ver app/jobs/sales.py):
+    # el coste depende del rango de días, no del historial completo de compras
+    return category_sales_report(session, since=since, until=until, top=top)
+
+
+@router.post("/jobs/compact-clicks")
+def run_click_compaction(
+    admin: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    # Agrega en ClickRollup los clics nuevos desde la última marca
+    return {"processed": compact_clicks(session)}
+
+
+@router.post("/jobs/refresh-category-sales")
+def run_category_sales_refresh(
+    admin: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    # Agrega en el resumen diario las compras nuevas desde la última marca
+    return {"processed": refresh_category_sales(session)}
+
+
+@router.post("/jobs/recount-counters")
+def run_counters_recount(
+    admin: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    # Reconstruye platform_counters desde las tablas (por si hubo escrituras fuera de la API)
+    counters = recount_platform_counters(session)
+    return counters.model_dump()
+
+
+@router.post("/jobs/rebuild-trending")
+def run_trending_rebuild(
+    days: int = Query(default=7, ge=1, le=90),
+    admin: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    # Reconstruye el ranking de tendencias desde compras y clics (p. ej. tras perder trending.json)
+    return {"products": rebuild_trending(session, trending, days=days)}
 
 
 @router.post("/users/{user_id}/add-balance")
 def add_balance(
     user_id: int, 
     amount: float, 
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     admin: User = Depends(get_current_admin_user), 
     session: Session = Depends(get_session)
 ):
     if amount <= 0:
         raise HTTPException(status_code=400, detail="El monto debe ser mayor a 0")
+
+    # Reintento de una recarga ya aplicada: no volvemos a sumar
+    idem = IdempotentRequest(f"add-balance:{admin.id}", idempotency_key, request)
+    replay = idem.claim(session)
+    if replay is not None:
+        return replay
         
-    user = session.get(User, user_id)
-    if not user:
+    # Suma atómica, como el cobro del checkout: un checkout simultáneo no se pierde
+    updated = session.exec(
+        update(User)
+        .where(User.id == user_id)
+        .values(balance=User.balance + amount)
+        .returning(User.balance, User.username)
+    ).one_or_none()
+    if updated is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        
-    user.balance += amount
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    new_balance, username = updated
+
+    bump_versions(session, user_version(user_id))
+    result = idem.commit(session, {"message": "Saldo actualizado", "new_balance": new_balance})
+    invalidate_cached_user(username)
     
-    return {"message": "Saldo actualizado", "new_balance": user.balance}
+    return result
 
 
@@ -1,36 +1,82 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
-from sqlmodel import Session, select
+from sqlalchemy import and_, distinct
+from sqlmodel import Session, select, func
 from typing import Optional, List
-import jose
-from app.database import get_session
+from app.database import get_session, get_db, run_db
 from app.models.affiliates import AffiliateLink, ClickEvent
 from app.schemas.affiliates import AffiliateLinkCreate
-from app.models.users import User
 from app.models.products import Product
-from app.core.security import ALGORITHM, SECRET_KEY, get_current_user
+from app.core.security import get_current_user_snapshot, UserSnapshot, decode_username, resolve_user_snapshot, user_cache
+from app.core.cache import create_cache, shared_value
+from app.core.periodic import PeriodicTask
+from app.core.versions import VersionWatcher, bump_versions, product_links_version
+from app.core.click_buffer import click_buffer
+from app.core.trending import CLICK_WEIGHT, trending
+from app.core.response_cache import response_cache
+from app.jobs.clicks import click_timeseries
 
 router = APIRouter(prefix="/affiliates", tags=["Affiliates"])
 
-def get_optional_user_id(request: Request, session: Session) -> Optional[int]:
-    auth_header = request.headers.get("Authorization")
+@shared_value
+@dataclass(frozen=True)
+class LinkTarget:
+    """Lo único que necesita el redirect de un AffiliateLink. url=None: el link no existe."""
+    url: Optional[str]
+    is_active: bool
+    product_id: Optional[int]
+
+MISSING_LINK = LinkTarget(url=None, is_active=False, product_id=None)
+
+# link_id -> LinkTarget (incluye caché negativa para IDs inexistentes)
+link_cache = create_cache(
+    "affiliate_links",
+    maxsize=int(os.getenv("AFFILIATE_LINK_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AFFILIATE_LINK_CACHE_TTL", "600")),
+)
+# Los IDs inexistentes caducan pronto: un link recién creado en otro worker
+# no puede borrar la entrada negativa de este
+AFFILIATE_LINK_NEGATIVE_TTL = float(os.getenv("AFFILIATE_LINK_NEGATIVE_TTL", "5"))
+
+# Las desactivaciones suben esta versión; cada worker la consulta y vacía su caché
+AFFILIATE_LINKS_VERSION = "affiliate_links"
+link_cache_watcher = VersionWatcher(AFFILIATE_LINKS_VERSION, link_cache.clear)
+link_cache_poller = PeriodicTask(
+    "affiliate-link-cache",
+    float(os.getenv("AFFILIATE_LINK_POLL_INTERVAL", "2.0")),
+    link_cache_watcher.check,
+)
+
+def load_link_target(session: Session, link_id: int) -> LinkTarget:
+    link = session.get(AffiliateLink, link_id)
+    if link:
+        target = LinkTarget(link.url, link.is_active, link.product_id)
+        link_cache.set(link_id, target)
+    else:
+        target = MISSING_LINK
+        link_cache.set(link_id, target, ttl=AFFILIATE_LINK_NEGATIVE_TTL)
+    return target
+
+async def get_optional_user_id(auth_header: Optional[str], session) -> Optional[int]:
     if not auth_header or not auth_header.startswith("Bearer "):
         return None
-    try:
-        token = auth_header.split(" ")[1]
-        payload = jose.jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        # Buscamos el ID real basado en el username del token
-        user = session.exec(select(User).where(User.username == username)).first()
-        return user.id if user else None
-    except Exception:
+    username = decode_username(auth_header.split(" ")[1])
+    if username is None:
         return None
+    # ID real del username del token: de la caché de usuarios, o de la DB si no está
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        snapshot = await run_db(session, resolve_user_snapshot, username)
+    return snapshot.id if snapshot else None
 
 @router.post("", response_model=AffiliateLink, status_code=status.HTTP_201_CREATED)
 def create_affiliate_link(
     data: AffiliateLinkCreate,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
     product = session.get(Product, data.product_id)
     if not product:
@@ -41,55 +87,149 @@ def create_affiliate_link(
 
     new_link = AffiliateLink(**data.model_dump())
     session.add(new_link)
+    bump_versions(session, product_links_version(new_link.product_id))
     session.commit()
     session.refresh(new_link)
+    # Por si el ID estaba en la caché negativa (en los demás workers caduca en AFFILIATE_LINK_NEGATIVE_TTL)
+    link_cache.delete(new_link.id)
     return new_link
 
+@router.post("/{link_id}/deactivate", response_model=AffiliateLink)
+def deactivate_affiliate_link(
+    link_id: int,
+    session: Session = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
+):
+    link = session.get(AffiliateLink, link_id)
+    if not link:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+
+    product = session.get(Product, link.product_id)
+    if not product or product.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permission denied")
+
+    link.is_active = False
+    session.add(link)
+    bump_versions(session, AFFILIATE_LINKS_VERSION, product_links_version(link.product_id))
+    session.commit()
+    session.refresh(link)
+    link_cache.delete(link_id)
+    return link
+
 @router.get("/go/{link_id}")
-def redirect_and_track(
+async def redirect_and_track(
     link_id: int,
     request: Request,
-    session: Session = Depends(get_session)
+    session = Depends(get_db)
 ):
-    link = session.get(AffiliateLink, link_id)
-    if not link or not link.is_active:
+    # Con el link (y el usuario) en caché, el redirect no toca la base de datos
+    target = link_cache.get(link_id)
+    if target is None:
+        target = await run_db(session, load_link_target, link_id)
+    if not target.is_active:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid or inactive link")
-    
-    new_click = ClickEvent(
-        link_id=link.id,
-        user_id=get_optional_user_id(request, session),
+
+    # El clic se encola y se inserta por lotes en segundo plano (sin COMMIT en el redirect)
+    click_buffer.add(
+        link_id=link_id,
+        user_id=await get_optional_user_id(request.headers.get("Authorization"), session),
         referrer=request.headers.get("referer")
     )
-
-    session.add(new_click)
-    session.commit()
-    return RedirectResponse(url=link.url)
+    trending.record(target.product_id, CLICK_WEIGHT)
+    return RedirectResponse(url=target.url)
 
 @router.get("/product/{product_id}", response_model=List[AffiliateLink])
-def get_product_links(product_id: int, session: Session = Depends(get_session)):
+def get_product_links(product_id: int, request: Request, session: Session = Depends(get_session)):
+    # Los links solo cambian al crearlos/desactivarlos, que suben esta versión
+    tokens = response_cache.begin(session, [product_links_version(product_id)])
+    cached = response_cache.get(request, tokens)
+    if cached is not None:
+        return cached
+
     statement = select(AffiliateLink).where(
         AffiliateLink.product_id == product_id,
         AffiliateLink.is_active == True
     )
-    return session.exec(statement).all()
+    return response_cache.render(request, tokens, List[AffiliateLink], session.exec(statement).all())
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # created_at se guarda en UTC sin zona horaria
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 @router.get("/analytics/{product_id}")
 def get_product_analytics(
     product_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
     product = session.get(Product, product_id)
     if not product or product.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
+    # Una sola consulta agrupada; el rango va en el ON para conservar links sin clics
+    click_filter = [ClickEvent.link_id == AffiliateLink.id]
+    since, until = _as_naive_utc(since), _as_naive_utc(until)
+    if since is not None:
+        click_filter.append(ClickEvent.created_at >= since)
+    if until is not None:
+        click_filter.append(ClickEvent.created_at < until)
+
+    statement = (
+        select(
+            AffiliateLink.id,
+            AffiliateLink.platform_name,
+            func.count(ClickEvent.id),
+            func.count(distinct(ClickEvent.user_id)),
+        )
+        .outerjoin(ClickEvent, and_(*click_filter))
+        .where(AffiliateLink.product_id == product_id)
+        .group_by(AffiliateLink.id, AffiliateLink.platform_name)
+        .order_by(AffiliateLink.id)
+    )
+
     stats = [
         {
-            "platform": link.platform_name,
-            "total_clicks": len(link.clicks),
-            "unique_users": len({c.user_id for c in link.clicks if c.user_id})
+            "link_id": link_id,
+            "platform": platform,
+            "total_clicks": total_clicks,
+            "unique_users": unique_users
         }
-        for link in product.affiliate_links
+        for link_id, platform, total_clicks, unique_users in session.exec(statement).all()
     ]
     return {"product_title": product.title, "analytics": stats}
 
+@router.get("/analytics/{product_id}/timeseries")
+def get_product_click_timeseries(
+    product_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
+):
+    product = session.get(Product, product_id)
+    if not product or product.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    until = _as_naive_utc(until) or datetime.utcnow()
+    since = _as_naive_utc(since) or until - timedelta(days=7)
+    links = session.exec(
+        select(AffiliateLink.id, AffiliateLink.platform_name)
+        .where(AffiliateLink.product_id == product_id)
+        .order_by(AffiliateLink.id)
+    ).all()
+
+    # Rollups horarios + cola de eventos aún sin compactar (unique_users es aproximado)
+    series = click_timeseries(session, [link_id for link_id, _ in links], since, until)
+    return {
+        "product_title": product.title,
+        "since": since,
+        "until": until,
+        "links": [
+            {"link_id": link_id, "platform": platform, **series[link_id]}
+            for link_id, platform in links
+        ],
+    }
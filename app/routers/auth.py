@@ -1,49 +1,72 @@
+from typing import Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
-from app.database import get_session
+from app.database import get_db, run_db
 from app.models.users import User
 from app.schemas.users import UserCreate # Schema imported from new location
-from app.core.auth_utils import hash_password, verify_password, create_access_token
+from app.core.counters import bump_counters
+from app.core.auth_utils import hash_password_async, verify_password_async, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, session: Session = Depends(get_session)):
-    # Check for existing user by email or username
+def _is_registered(session: Session, username: str, email: str) -> bool:
     existing_user = session.exec(
-        select(User).where((User.email == user_data.email) | (User.username == user_data.username))
+        select(User).where((User.email == email) | (User.username == username))
     ).first()
+    # Liberamos la conexión antes de hashear: bcrypt tarda cientos de ms
+    session.close()
+    return existing_user is not None
 
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username or email already registered"
-        )
-
-    new_user = User(
-        username=user_data.username,
-        email=user_data.email,
-        hashed_password=hash_password(user_data.password)
-    )
+def _create_user(session: Session, username: str, email: str, hashed_password: str) -> Optional[int]:
+    new_user = User(username=username, email=email, hashed_password=hashed_password)
     session.add(new_user)
-    session.commit()
+    bump_counters(session, total_users=1)
+    try:
+        session.commit()
+    except IntegrityError:
+        # Otro registro con el mismo username/email ganó la carrera
+        session.rollback()
+        return None
     session.refresh(new_user)
-    return {"message": "User created successfully", "id": new_user.id}
+    return new_user.id
+
+def _get_credentials(session: Session, username: str) -> Optional[Tuple[str, str]]:
+    user = session.exec(select(User).where(User.username == username)).first()
+    credentials = (user.username, user.hashed_password) if user else None
+    session.close()
+    return credentials
+
+@router.post("/register", status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserCreate, session = Depends(get_db)):
+    already_registered = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Username or email already registered"
+    )
+
+    # Check for existing user by email or username
+    if await run_db(session, _is_registered, user_data.username, user_data.email):
+        raise already_registered
+
+    hashed_password = await hash_password_async(user_data.password)
+    user_id = await run_db(session, _create_user, user_data.username, user_data.email, hashed_password)
+    if user_id is None:
+        raise already_registered
+    return {"message": "User created successfully", "id": user_id}
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session)
+    session = Depends(get_db)
 ):
-    user = session.exec(select(User).where(User.username == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    credentials = await run_db(session, _get_credentials, form_data.username)
+    if not credentials or not await verify_password_async(form_data.password, credentials[1]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data={"sub": credentials[0]})
     return {"access_token": access_token, "token_type": "bearer"}
-
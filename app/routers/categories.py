@@ -1,20 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import List
 from app.database import get_session
 from app.models.categories import Category
-from app.schemas.categories import CategoryCreate
+from app.schemas.categories import CategoryCreate, CategoryPublic
 from app.models.users import User
 from app.core.security import get_current_admin_user 
+from app.core.catalog import CATEGORIES_VERSION, category_catalog
+from app.core.versions import bump_version
+from app.core.etag import etag_matches, not_modified
 from sqlalchemy.exc import IntegrityError
 import re # Para validar slugs manualmente si fuera necesario
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
-@router.get("", response_model=List[Category])
-def get_categories(session: Session = Depends(get_session)):
+@router.get("", response_model=List[CategoryPublic])
+async def get_categories(request: Request):
     """Public endpoint to list all categories."""
-    return session.exec(select(Category)).all()
+    # Servido desde memoria: el JSON ya está serializado y no se consulta la BD
+    if not category_catalog.loaded:
+        await run_in_threadpool(category_catalog.refresh)
+    body, etag = category_catalog.snapshot
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @router.post("", response_model=Category, status_code=status.HTTP_201_CREATED)
 def create_category(
@@ -37,8 +47,11 @@ def create_category(
 
     try:
         session.add(new_category)
+        # Misma transacción: si el INSERT falla la versión no se mueve
+        bump_version(session, CATEGORIES_VERSION)
         session.commit()
         session.refresh(new_category)
+        category_catalog.refresh()
         return new_category
     except IntegrityError:
         session.rollback()
@@ -3,8 +3,7 @@ from sqlmodel import Session
 import bleach
 from app.database import get_session
 from app.models.products import Comment, Product
-from app.models.users import User
-from app.core.security import get_current_user
+from app.core.security import get_current_user_snapshot, UserSnapshot
 from app.schemas.comments import CommentCreate
 
 
@@ -15,7 +14,7 @@ router = APIRouter(prefix="/comments", tags=["Comments"])
 def create_comment(
     comment_in: CommentCreate, # <--- Usamos el Schema aquí
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
     product = session.get(Product, comment_in.product_id)
     if not product:
@@ -1,36 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy import delete, insert, update
 from sqlmodel import Session, select
 from app.database import get_session
-from app.models.interactions import CartItem, ProductLike, Purchase # Añadimos Purchase
+from app.models.interactions import CartItem, Purchase # Añadimos Purchase
 from app.models.users import User
 from app.models.products import Product # Necesario para validar existencia y precio
-from app.core.security import get_current_user
+from app.core.security import get_current_user_snapshot, UserSnapshot
+from app.core.likes import apply_like_delta, apply_reputation_delta, toggle_like_row
+from app.core.idempotency import IdempotentRequest
+from app.core.counters import bump_counters
+from app.core.versions import bump_versions, user_version
+from app.core.trending import LIKE_WEIGHT, PURCHASE_WEIGHT, trending
 
 router = APIRouter(prefix="/interactions", tags=["Interactions"])
 
 @router.post("/like/{product_id}")
-def toggle_like(product_id: int, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def toggle_like(product_id: int, current_user: UserSnapshot = Depends(get_current_user_snapshot), session: Session = Depends(get_session)):
     # Validar que el producto existe antes de dar like
     product = session.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
-    statement = select(ProductLike).where(ProductLike.user_id == current_user.id, ProductLike.product_id == product_id)
-    like = session.exec(statement).first()
-
-    if like:
-        session.delete(like)
-        msg = "Like removed"
-    else:
-        new_like = ProductLike(user_id=current_user.id, product_id=product_id)
-        session.add(new_like)
-        msg = "Like added"
+    delta = toggle_like_row(session, current_user.id, product_id)
+    msg = "Like added" if delta > 0 else "Like removed"
+    likes_count = apply_like_delta(session, product_id, delta)
+    # La reputación del autor se mantiene igual que desde /products/{id}/like
+    if product.owner_id:
+        apply_reputation_delta(session, product.owner_id, delta)
+    bump_versions(session, user_version(current_user.id), user_version(product.owner_id))
 
     session.commit()
-    return {"message": msg}
+    trending.record(product_id, LIKE_WEIGHT * delta, like=True)
+    return {"message": msg, "likes_count": likes_count}
 
 @router.post("/cart/{product_id}")
-def add_to_cart(product_id: int, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def add_to_cart(product_id: int, current_user: UserSnapshot = Depends(get_current_user_snapshot), session: Session = Depends(get_session)):
     # Validar que el producto existe
     product = session.get(Product, product_id)
     if not product:
@@ -45,6 +51,7 @@ def add_to_cart(product_id: int, current_user: User = Depends(get_current_user),
     else:
         new_item = CartItem(user_id=current_user.id, product_id=product_id, quantity=1)
         session.add(new_item)
+    bump_versions(session, user_version(current_user.id))
 
     session.commit()
     return {"message": "Added to cart"}
@@ -53,55 +60,80 @@ def add_to_cart(product_id: int, current_user: User = Depends(get_current_user),
 
 @router.post("/checkout")
 def process_checkout(
-    current_user: User = Depends(get_current_user), 
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot),
     session: Session = Depends(get_session)
 ):
-    # 1. Traer todos los items del carrito del usuario
-    statement = select(CartItem).where(CartItem.user_id == current_user.id)
-    cart_items = session.exec(statement).all()
-
-    if not cart_items:
+    # 0. Reservamos la Idempotency-Key antes de tocar nada: un reintento simultáneo espera
+    #    aquí y devuelve el resultado original en vez de encontrarse el carrito ya vacío
+    idem = IdempotentRequest(f"checkout:{current_user.id}", idempotency_key, request)
+    replay = idem.claim(session)
+    if replay is not None:
+        return replay
+
+    # 1. Reclamar el carrito: DELETE ... RETURNING lo vacía y lo lee en un solo paso,
+    #    así dos checkouts simultáneos no pueden comprar los mismos items
+    claimed = session.exec(
+        delete(CartItem)
+        .where(CartItem.user_id == current_user.id)
+        .returning(CartItem.product_id, CartItem.quantity)
+    ).all()
+
+    if not claimed:
         raise HTTPException(status_code=400, detail="El carrito está vacío")
 
-    # 2. Calcular el costo total
-    total_cost = 0
-    items_to_buy = []
-    
-    for item in cart_items:
-        product = session.get(Product, item.product_id)
-        if product:
-            total_cost += product.price * item.quantity
-            items_to_buy.append((product, item.quantity))
-
-    # 3. Validar Saldo
-    if current_user.balance < total_cost:
+    # 2. Precios de todos los productos en una sola consulta
+    quantities = {product_id: quantity for product_id, quantity in claimed}
+    prices = session.exec(
+        select(Product.id, Product.price).where(Product.id.in_(quantities))
+    ).all()
+    missing = sorted(set(quantities) - {product_id for product_id, _ in prices})
+    if missing:
+        # Producto borrado después de añadirlo: no se cobra un carrito distinto del que vio el usuario
+        session.rollback()
         raise HTTPException(
-            status_code=400, 
-            detail=f"Saldo insuficiente. Tienes ${current_user.balance}, necesitas ${total_cost}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Productos ya no disponibles: {missing}. Quítalos del carrito"
         )
-
-    # 4. Ejecutar la compra (Transacción)
-    current_user.balance -= total_cost
-    session.add(current_user)
-
-    for product, quantity in items_to_buy:
-        # Registramos la compra
-        new_purchase = Purchase(
-            user_id=current_user.id,
-            product_id=product.id,
-            price_at_purchase=product.price # Importante por si el precio cambia después
+    total_cost = sum(price * quantities[product_id] for product_id, price in prices)
+
+    # 3. Cobro atómico: la condición de saldo se evalúa dentro del UPDATE
+    remaining_balance = session.exec(
+        update(User)
+        .where(User.id == current_user.id, User.balance >= total_cost)
+        .values(balance=User.balance - total_cost)
+        .returning(User.balance)
+    ).scalar_one_or_none()
+
+    if remaining_balance is None:
+        # Deshace también el borrado del carrito
+        session.rollback()
+        balance = session.exec(select(User.balance).where(User.id == current_user.id)).one()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Saldo insuficiente. Tienes ${balance}, necesitas ${total_cost}"
         )
-        session.add(new_purchase)
-
-    # 5. Vaciar el carrito
-    for item in cart_items:
-        session.delete(item)
-
-    session.commit()
-    
-    return {
-        "message": "Compra exitosa", 
-        "total_paid": total_cost, 
-        "remaining_balance": current_user.balance
-    }
 
+    # 4. Registrar las compras en un solo INSERT
+    session.exec(insert(Purchase).values([
+        {
+            "user_id": current_user.id,
+            "product_id": product_id,
+            "quantity": quantities[product_id],
+            "price_at_purchase": price,  # Importante por si el precio cambia después
+            "purchase_date": datetime.utcnow(),
+        }
+        for product_id, price in prices
+    ]))
+    bump_counters(session, total_sales=len(prices), total_revenue=total_cost)
+    bump_versions(session, user_version(current_user.id))
+
+    result = idem.commit(session, {
+        "message": "Compra exitosa",
+        "total_paid": total_cost,
+        "remaining_balance": remaining_balance
+    })
+    for product_id, _ in prices:
+        trending.record(product_id, PURCHASE_WEIGHT * quantities[product_id])
+    return result
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlmodel import Session, select, func
 from typing import List, Optional
-from app.database import get_session
+from app.database import get_session, get_db, run_db
 from app.models.products import Product
 from app.models.users import User
-from app.schemas.products import ProductCreate, ProductUpdate
+from app.schemas.products import ProductCreate, ProductUpdate, ProductPage
 from app.models.interactions import ProductLike, CartItem # Importamos CartItem también
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_snapshot, UserSnapshot
+from app.core.likes import apply_like_delta, apply_reputation_delta, toggle_like_row
+from app.core.counters import bump_counters
+from app.core.etag import etag_matches, make_etag, not_modified
+from app.core.versions import PRODUCTS_VERSION, bump_versions, like_count_epoch, product_links_version, read_versions, user_version
+from app.core.pagination import keyset_paginate, split_page
+from app.core.trending import LIKE_WEIGHT, trending
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/products", tags=["Products"], redirect_slashes=False)
@@ -17,39 +23,87 @@ def get_optional_user(
 ) -> Optional[User]:
     return current_user
 
-@router.get("", response_model=List[dict]) # Usamos dict para enviar campos dinámicos
-def get_products(
-    offset: int = 0,
-    limit: int = Query(default=100, le=100),
-    session: Session = Depends(get_session),
-    current_user: Optional[User] = Depends(get_current_user) # Cambiado para que sea inyectado si existe
-):
-    products = session.exec(select(Product).offset(offset).limit(limit)).all()
-    
-    # IDs de productos con Like y en Carrito del usuario actual
-    liked_ids = []
-    cart_ids = []
-    if current_user:
-        liked_ids = session.exec(select(ProductLike.product_id).where(ProductLike.user_id == current_user.id)).all()
-        cart_ids = session.exec(select(CartItem.product_id).where(CartItem.user_id == current_user.id)).all()
+# Orden estable del listado: más nuevos primero, desempatando por id
+LISTING_SORT = "newest"
+LISTING_KEYS = (Product.created_at, Product.id)
+
+def list_products_page(session: Session, cursor: Optional[str], limit: int, user_id: Optional[int]) -> dict:
+    statement = keyset_paginate(select(Product), LISTING_SORT, LISTING_KEYS, True, cursor, limit)
+    products, next_cursor = split_page(session.exec(statement).all(), LISTING_SORT, LISTING_KEYS, limit)
+    page_ids = [p.id for p in products]
+
+    # Flags del usuario en consultas fijas, limitadas a los IDs de la página
+    liked_ids = set()
+    cart_ids = set()
+    if page_ids and user_id:
+        liked_ids = set(session.exec(
+            select(ProductLike.product_id).where(
+                ProductLike.user_id == user_id,
+                ProductLike.product_id.in_(page_ids)
+            )
+        ).all())
+        cart_ids = set(session.exec(
+            select(CartItem.product_id).where(
+                CartItem.user_id == user_id,
+                CartItem.product_id.in_(page_ids)
+            )
+        ).all())
 
     result = []
     for p in products:
         p_data = p.model_dump()
         p_data["is_liked_by_me"] = p.id in liked_ids
         p_data["is_in_cart"] = p.id in cart_ids
-        # Calculamos el total de likes en tiempo real
-        likes_count = session.exec(select(func.count(ProductLike.user_id)).where(ProductLike.product_id == p.id)).one()
-        p_data["likes_count"] = likes_count
+        p_data["likes_count"] = p.like_count
         result.append(p_data)
         
-    return result
+    return {"items": result, "next_cursor": next_cursor}
+
+@router.get("", response_model=ProductPage) # items son dicts para enviar campos dinámicos
+async def get_products(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=100),
+    session = Depends(get_db),
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_snapshot) # Snapshot en caché: sin consulta por request
+):
+    user_id = current_user.id if current_user else None
+
+    # Validador barato (una lectura por PK) antes de montar la página y los flags del usuario
+    names = [PRODUCTS_VERSION] + ([user_version(user_id)] if user_id else [])
+    versions = await run_db(session, read_versions, names)
+    etag = make_etag("products", cursor, limit, user_id, like_count_epoch(), *versions.values())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    return await run_db(session, list_products_page, cursor, limit, user_id)
+
+@router.get("/trending")
+def get_trending_products(limit: int = Query(default=20, ge=1, le=100)):
+    # Ranking en memoria con decaimiento temporal: sin consulta, coste independiente del número de productos
+    return {"items": trending.top(limit)}
+
+@router.post("", status_code=status.HTTP_201_CREATED)
+def create_product(
+    product_data: ProductCreate,
+    session: Session = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
+):
+    product = Product(**product_data.model_dump(), owner_id=current_user.id)
+    session.add(product)
+    bump_counters(session, total_products=1)
+    bump_versions(session, PRODUCTS_VERSION)
+    session.commit()
+    session.refresh(product)
+    return product
 
 @router.delete("/{product_id}")
 def delete_product(
     product_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
     product = session.get(Product, product_id)
     if not product:
@@ -61,46 +115,38 @@ def delete_product(
             detail="Not enough permissions to delete this product"
         )
 
+    # Los likes del producto dejan de contar en la reputación del dueño (recuento en la misma sentencia)
+    received_likes = select(func.count(ProductLike.user_id)).where(ProductLike.product_id == product_id).scalar_subquery()
+    apply_reputation_delta(session, product.owner_id, -received_likes)
     session.delete(product)
+    bump_counters(session, total_products=-1)
+    bump_versions(session, PRODUCTS_VERSION, user_version(current_user.id), product_links_version(product_id))
     session.commit()
+    trending.discard(product_id)
     return {"message": "Product deleted successfully"}
 
 @router.post("/{product_id}/like")
 def toggle_product_like(
     product_id: int,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
     product = session.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    owner = session.get(User, product.owner_id)
-
-    statement = select(ProductLike).where(
-        ProductLike.user_id == current_user.id,
-        ProductLike.product_id == product_id
-    )
-    existing_like = session.exec(statement).first()
-
-    if existing_like:
-        session.delete(existing_like)
-        if owner: owner.reputation -= 1
-        message = "Like removed"
-    else:
-        new_like = ProductLike(user_id=current_user.id, product_id=product_id)
-        session.add(new_like)
-        if owner: owner.reputation += 1
-        message = "Like added"
+    delta = toggle_like_row(session, current_user.id, product_id)
+    message = "Like added" if delta > 0 else "Like removed"
+    likes_count = apply_like_delta(session, product_id, delta)
+    owner_reputation = apply_reputation_delta(session, product.owner_id, delta) if product.owner_id else 0
+    bump_versions(session, user_version(current_user.id), user_version(product.owner_id))
 
     session.commit()
-    
-    # Obtenemos el nuevo conteo de likes después del cambio
-    likes_count = session.exec(select(func.count(ProductLike.user_id)).where(ProductLike.product_id == product_id)).one()
+    trending.record(product_id, LIKE_WEIGHT * delta, like=True)
 
     return {
         "message": message,
-        "is_liked": not existing_like,
+        "is_liked": delta > 0,
         "likes_count": likes_count,
-        "owner_reputation": owner.reputation if owner else 0
+        "owner_reputation": owner_reputation
     }
@@ -1,30 +1,46 @@
-from fastapi import APIRouter, Depends, Query # Added Query
-from sqlmodel import Session, select, or_
-from typing import List, Optional
-from app.database import get_session
+from fastapi import APIRouter, Depends, Query, Request # Added Query
+from sqlmodel import Session, select
+from typing import Optional
+from app.database import get_db, run_db
 from app.models.products import Product # Specific import
+from app.schemas.products import ProductPage
+from app.core.pagination import keyset_paginate, split_page
+from app.core.text_search import text_search_clause
+from app.core.response_cache import response_cache
+from app.core.versions import PRODUCTS_VERSION
+
+# Altas y bajas de productos invalidan las búsquedas cacheadas. Los likes no:
+# like_count puede ir hasta RESPONSE_CACHE_TTL segundos por detrás.
+SEARCH_TAGS = (PRODUCTS_VERSION,)
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
-@router.get("", response_model=List[Product])
-def search_products(
-    q: Optional[str] = None,
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    sort_by: str = "newest", # Options: newest, lowest_price, highest_price
-    limit: int = Query(default=20, le=50),
-    session: Session = Depends(get_session)
-):
-    statement = select(Product)
-
-    # 1. Full-text search (Title or Description)
-    if q:
-        statement = statement.where(
-            or_(
-                Product.title.icontains(q),
-                Product.description.icontains(q)
-            )
-        )
+# Sort mode -> (keyset columns, descending). The id breaks ties so the order is total.
+SORT_KEYS = {
+    "newest": ((Product.created_at, Product.id), True),
+    "lowest_price": ((Product.price, Product.id), False),
+    "highest_price": ((Product.price, Product.id), True),
+}
+
+def run_search(
+    session: Session,
+    q: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    sort_by: str,
+    cursor: Optional[str],
+    limit: int,
+) -> dict:
+    # 1. Full-text search (Title or Description), indexed per database engine
+    match = text_search_clause(session.get_bind().dialect.name, q) if q else None
+    rank = match[1] if match else None
+
+    if sort_by == "relevance" and rank is not None:
+        statement = select(Product, rank)
+    else:
+        statement = select(Product)
+    if match:
+        statement = statement.where(match[0])
 
     # 2. Price Range Filtering
     if min_price is not None:
@@ -32,15 +48,38 @@ def search_products(
     if max_price is not None:
         statement = statement.where(Product.price <= max_price)
 
-    # 3. Sorting Logic
-    if sort_by == "lowest_price":
-        statement = statement.order_by(Product.price.asc())
-    elif sort_by == "highest_price":
-        statement = statement.order_by(Product.price.desc())
-    else:
-        # Default: Newest first
-        statement = statement.order_by(Product.created_at.desc())
+    # 3. Sorting + keyset pagination (Default: Newest first)
+    if sort_by == "relevance" and rank is not None:
+        columns = (rank, Product.id)
+        statement = keyset_paginate(statement, sort_by, columns, True, cursor, limit)
+        rows, next_cursor = split_page(
+            session.exec(statement).all(), sort_by, columns, limit,
+            values_of=lambda row: [row[1], row[0].id],
+        )
+        return {"items": [row[0] for row in rows], "next_cursor": next_cursor}
+
+    if sort_by not in SORT_KEYS:
+        sort_by = "newest"
+    columns, descending = SORT_KEYS[sort_by]
+    statement = keyset_paginate(statement, sort_by, columns, descending, cursor, limit)
 
-    results = session.exec(statement.limit(limit)).all()
-    return results
+    results, next_cursor = split_page(session.exec(statement).all(), sort_by, columns, limit)
+    return {"items": results, "next_cursor": next_cursor}
 
+@router.get("", response_model=ProductPage)
+async def search_products(
+    request: Request,
+    q: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort_by: str = "newest", # Options: newest, lowest_price, highest_price, relevance (needs q)
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=50),
+    session = Depends(get_db)
+):
+    tokens = await run_db(session, response_cache.begin, SEARCH_TAGS)
+    cached = response_cache.get(request, tokens)
+    if cached is not None:
+        return cached
+    page = await run_db(session, run_search, q, min_price, max_price, sort_by, cursor, limit)
+    return response_cache.render(request, tokens, ProductPage, page)
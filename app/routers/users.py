@@ -1,44 +1,152 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, literal, null, or_, true, union_all
 from sqlmodel import Session, select, func
-from typing import List
+from typing import Dict, List, Literal, Optional
 from app.database import get_session
 from app.models.users import User
 from app.models.products import Product
 from app.schemas.users import UserPublic, UserUpdate
+from app.schemas.products import ProductPage
 from app.models.interactions import CartItem, Purchase, ProductLike
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_snapshot, invalidate_cached_user, UserSnapshot
+from app.core.pagination import encode_cursor, keyset_paginate, split_page
+from app.core.etag import etag_matches, make_etag, not_modified
+from app.core.versions import PRODUCTS_VERSION, bump_versions, like_count_epoch, read_versions, user_version
 from sqlalchemy.orm import selectinload
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-# ... (get_my_products remains same) ...
+# Secciones del perfil: (tabla, clave de orden/cursor, cantidad), en orden descendente
+# por la clave: compras más recientes primero; carrito y likes por product_id (no guardan fecha).
+PROFILE_SECTIONS = {
+    "cart": (CartItem, CartItem.product_id, CartItem.quantity),
+    "liked": (ProductLike, ProductLike.product_id, None),
+    "purchases": (Purchase, Purchase.id, Purchase.quantity),
+}
+PROFILE_SECTION_LIMIT = int(os.getenv("PROFILE_SECTION_LIMIT", "10"))
 
-@router.get("/me", response_model=UserPublic)
-def get_my_profile(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    # 1. ¡ESTO ES LO QUE FALTA! Las consultas para definir las variables
-    cart_items = session.exec(
-        select(Product).join(CartItem).where(CartItem.user_id == current_user.id)
-    ).all()
 
-    liked_items = session.exec(
-        select(Product).join(ProductLike).where(ProductLike.user_id == current_user.id)
-    ).all()
-    
-    # También traemos las compras para el historial
-    purchases_items = session.exec(
-        select(Product).join(Purchase).where(Purchase.user_id == current_user.id)
+def _section_item(section: str, product: Product, ref_id: int, quantity: Optional[int]) -> dict:
+    item = product.model_dump()
+    if quantity is not None:
+        item["quantity"] = quantity
+    if section == "purchases":
+        item["purchase_id"] = ref_id
+    return item
+
+
+def load_profile(session: Session, user_id: int, limits: Dict[str, int]) -> Optional[UserPublic]:
+    """
+    Perfil completo en una sola consulta: UNION ALL de las secciones con row_number()
+    (para cortar cada una en su límite) y count(*) OVER (para el total), unido al usuario.
+    """
+    branches = []
+    for section, (model, key, quantity) in PROFILE_SECTIONS.items():
+        branches.append(
+            select(
+                literal(section).label("section"),
+                key.label("ref_id"),
+                model.product_id.label("product_id"),
+                (quantity if quantity is not None else null()).label("quantity"),
+                func.row_number().over(order_by=key.desc()).label("rn"),
+                func.count().over().label("total"),
+            ).where(model.user_id == user_id)
+        )
+    ranked = union_all(*branches).subquery()
+    # Con límite 0 dejamos pasar una fila igualmente para conocer el total
+    sections = (
+        select(ranked)
+        .where(or_(*[
+            and_(ranked.c.section == section, ranked.c.rn <= max(limits[section], 1))
+            for section in PROFILE_SECTIONS
+        ]))
+        .subquery()
+    )
+    rows = session.exec(
+        select(User, sections.c.section, sections.c.ref_id, sections.c.quantity, sections.c.rn, sections.c.total, Product)
+        .select_from(User)
+        .outerjoin(sections, true())
+        .outerjoin(Product, Product.id == sections.c.product_id)
+        .where(User.id == user_id)
+        .order_by(sections.c.section, sections.c.rn)
     ).all()
+    if not rows:
+        return None
+
+    profile = UserPublic.model_validate(rows[0][0])
+    items = {section: [] for section in PROFILE_SECTIONS}
+    counts = {section: 0 for section in PROFILE_SECTIONS}
+    cursors = {section: None for section in PROFILE_SECTIONS}
+    for _, section, ref_id, quantity, rn, total, product in rows:
+        if section is None:
+            continue
+        counts[section] = total
+        if limits[section] == 0:
+            # Solo el total: el cursor apunta justo antes del primer elemento
+            cursors[section] = encode_cursor(section, [ref_id + 1])
+        elif rn <= limits[section]:
+            items[section].append(_section_item(section, product, ref_id, quantity))
+            if rn == limits[section] and total > rn:
+                cursors[section] = encode_cursor(section, [ref_id])
+
+    profile.cart_items = items["cart"]
+    profile.liked_items = items["liked"]
+    profile.purchases_items = items["purchases"]
+    profile.cart_count = counts["cart"]
+    profile.liked_count = counts["liked"]
+    profile.purchases_count = counts["purchases"]
+    profile.next_cursors = cursors
+    return profile
+
+
+@router.get("/me", response_model=UserPublic)
+def get_my_profile(
+    request: Request,
+    response: Response,
+    cart_limit: int = Query(default=PROFILE_SECTION_LIMIT, ge=0, le=100),
+    liked_limit: int = Query(default=PROFILE_SECTION_LIMIT, ge=0, le=100),
+    purchases_limit: int = Query(default=PROFILE_SECTION_LIMIT, ge=0, le=100),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot),
+    session: Session = Depends(get_session)
+):
+    # Cada sección trae como mucho su límite; el resto se pide en /users/me/{section}
+    limits = {"cart": cart_limit, "liked": liked_limit, "purchases": purchases_limit}
 
-    # 2. Validamos el usuario base
-    user_data = UserPublic.model_validate(current_user)
+    # Las secciones muestran datos de productos: cuentan las dos versiones y la ventana de like_count
+    versions = read_versions(session, [PRODUCTS_VERSION, user_version(current_user.id)])
+    etag = make_etag("me", current_user.id, cart_limit, liked_limit, purchases_limit, like_count_epoch(), *versions.values())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
 
-    # 3. Ahora sí, asignamos (aquí es donde fallaba porque no existían arriba)
-    user_data.cart_items = cart_items
-    user_data.liked_items = liked_items
-    user_data.purchases_items = purchases_items
-    user_data.purchases_count = len(purchases_items)
+    profile = load_profile(session, current_user.id, limits)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return profile
 
-    return user_data
+
+@router.get("/me/{section}", response_model=ProductPage)
+def get_my_profile_section(
+    section: Literal["cart", "liked", "purchases"],
+    cursor: Optional[str] = None,
+    limit: int = Query(default=PROFILE_SECTION_LIMIT, ge=1, le=100),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot),
+    session: Session = Depends(get_session)
+):
+    # Páginas siguientes de una sección, con el next_cursor del perfil
+    model, key, quantity = PROFILE_SECTIONS[section]
+    statement = (
+        select(Product, key, quantity if quantity is not None else null())
+        .join(model, model.product_id == Product.id)
+        .where(model.user_id == current_user.id)
+    )
+    statement = keyset_paginate(statement, section, (key,), True, cursor, limit)
+    rows, next_cursor = split_page(session.exec(statement).all(), section, (key,), limit, values_of=lambda r: [r[1]])
+    return {
+        "items": [_section_item(section, product, ref_id, qty) for product, ref_id, qty in rows],
+        "next_cursor": next_cursor,
+    }
 
 
 @router.put("/me", response_model=UserPublic)
@@ -57,17 +165,13 @@ def update_my_profile(
         setattr(current_user, key, value)
 
     session.add(current_user)
+    bump_versions(session, user_version(current_user.id))
     session.commit()
     session.refresh(current_user)
+    invalidate_cached_user(current_user.username)
 
-    # Cálculo dinámico para la respuesta UserPublic
-    reputation = sum(len(p.favorited_by) for p in current_user.products)
-
-    return {
-        **current_user.model_dump(),
-        "total_reputation": reputation,
-        "products_count": len(current_user.products),
-        "products": current_user.products
-    }
+    # La reputación ya está guardada en User.reputation (la mantienen los likes),
+    # no hace falta recorrer los productos ni sus likes
+    return UserPublic.model_validate(current_user)
 # ... (get_user_profile remains same) ...
 
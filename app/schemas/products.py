@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import Optional, List, Any
 import bleach
 
 class ProductBase(BaseModel):
@@ -41,3 +41,8 @@ class ProductUpdate(BaseModel):
             return bleach.clean(v, tags=[], strip=True).strip()
         return v
 
+
+class ProductPage(BaseModel):
+    # Página de resultados con paginación por cursor (keyset)
+    items: List[Any]
+    next_cursor: Optional[str] = None
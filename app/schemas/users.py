@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 import bleach
 
 class UserBase(BaseModel):
@@ -42,7 +42,12 @@ class UserPublic(UserBase):
     cart_items: List[Any] = []
     liked_items: List[Any] = []
     purchases_items: List[Any] = [] # <--- ¡ESTE FALTABA!
+    # Totales por sección (las listas vienen recortadas a su límite)
+    cart_count: int = 0
+    liked_count: int = 0
     purchases_count: int = 0
+    # Cursor para /users/me/{section} cuando la sección tiene más elementos
+    next_cursors: Dict[str, Optional[str]] = {}
 
     class Config:
         from_attributes = True
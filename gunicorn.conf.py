@@ -0,0 +1,20 @@
+# gunicorn lo carga solo desde el directorio de trabajo: `gunicorn main:app -k uvicorn.workers.UvicornWorker`
+import os
+
+from app.core.shared_cache import remove_cache_files
+
+
+def _remove_shared_caches():
+    # Solo con CACHE_BACKEND=shared; se ejecuta en el master, sin workers que tengan los ficheros mapeados
+    directory = os.getenv("SHARED_CACHE_DIR")
+    if os.getenv("CACHE_BACKEND") == "shared" and directory:
+        remove_cache_files(directory)
+
+
+def on_starting(server):
+    # Restos de un master anterior que no llegó a salir limpio
+    _remove_shared_caches()
+
+
+def on_exit(server):
+    _remove_shared_caches()
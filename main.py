@@ -1,9 +1,21 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import SQLModel
-from app.database import create_db_and_tables
+from sqlmodel import SQLModel, Session
+from app.database import create_db_and_tables, engine
+from app.core.cache import attach_caches
+from app.core.click_buffer import click_buffer
+from app.core.idempotency import idempotency_sweeper
+from app.core.catalog import catalog_poller, category_catalog
+from app.core.trending import trending, trending_persister
+from app.routers.affiliates import link_cache_poller
+from app.jobs.retention import ensure_click_partitions
+from app.jobs.clicks import click_compactor
+from app.jobs.sales import category_sales_refresher
 from app.routers import auth, products, users, search, affiliates, categories, comments, interactions, admin
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="VestaAPI")
 
 # CORS Setup
@@ -28,7 +40,39 @@ SQLModel.metadata.naming_convention = {
 
 @app.on_event("startup")
 def on_startup():
+    # Con CACHE_BACKEND=shared, cada worker se conecta aquí a los ficheros compartidos
+    attach_caches()
     create_db_and_tables()
+    # Particiones de ClickEvent para este mes y los siguientes (no-op fuera de Postgres).
+    # Un fallo aquí no debe impedir arrancar: los clics caen en la partición DEFAULT
+    try:
+        with Session(engine) as session:
+            ensure_click_partitions(session)
+    except Exception:
+        logger.exception("Could not create ClickEvent partitions; clicks go to the DEFAULT partition")
+    click_buffer.start()
+    idempotency_sweeper.start()
+    category_sales_refresher.start()
+    click_compactor.start()
+    category_catalog.refresh()
+    catalog_poller.start()
+    link_cache_poller.run_once()
+    link_cache_poller.start()
+    trending.load()
+    trending_persister.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Vaciamos los clics pendientes antes de que el worker termine
+    click_buffer.stop()
+    idempotency_sweeper.stop()
+    category_sales_refresher.stop()
+    click_compactor.stop()
+    catalog_poller.stop()
+    link_cache_poller.stop()
+    # Último volcado para no perder los eventos de este worker
+    trending_persister.stop()
+    trending.persist()
 
 # Include Routers
 app.include_router(auth.router)
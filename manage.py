@@ -0,0 +1,515 @@
+import argparse
+import contextlib
+from typing import Optional
+from sqlmodel import Session
+from app.database import engine
+
+
+def reconcile_likes(args):
+    from app.jobs.likes import reconcile_like_counts
+    with Session(engine) as session:
+        drift = reconcile_like_counts(session, batch_size=args.batch_size, fix=not args.dry_run)
+    for product_id, stored, actual in drift:
+        print(f"Producto {product_id}: like_count={stored}, real={actual}")
+    action = "detectados" if args.dry_run else "corregidos"
+    print(f"✅ {len(drift)} desvíos {action}.")
+
+
+def reconcile_reputation(args):
+    from app.jobs.reputation import reconcile_reputation as run_reconcile
+    with Session(engine) as session:
+        drift = run_reconcile(session, batch_size=args.batch_size, fix=not args.dry_run)
+    for user_id, stored, actual in drift:
+        print(f"Usuario {user_id}: reputation={stored}, real={actual}")
+    action = "detectados" if args.dry_run else "corregidos"
+    print(f"✅ {len(drift)} desvíos {action}.")
+
+
+def compact_clicks(args):
+    from app.jobs.clicks import compact_clicks as run_compaction
+    with Session(engine) as session:
+        processed = run_compaction(session, batch_size=args.batch_size)
+    print(f"✅ {processed} clics compactados en rollups horarios.")
+
+
+def archive_clicks(args):
+    from app.jobs.retention import archive_old_clicks, ensure_click_partitions
+    with Session(engine) as session:
+        created = ensure_click_partitions(session)
+        archived = archive_old_clicks(session, horizon_months=args.months, archive_dir=args.archive_dir)
+    for name in created:
+        print(f"Partición creada: {name}")
+    for path, rows in archived:
+        print(f"{path}: {rows} clics archivados")
+    print(f"✅ {len(archived)} meses archivados.")
+
+
+def rebuild_rollups(args):
+    from app.jobs.retention import rebuild_rollups as run_rebuild
+    with Session(engine) as session:
+        replayed = run_rebuild(session, archive_dir=args.archive_dir, batch_size=args.batch_size)
+    print(f"✅ Rollups reconstruidos ({replayed} clics reproducidos desde archivos).")
+
+
+def refresh_category_sales(args):
+    from app.jobs.sales import refresh_category_sales as run_refresh
+    with Session(engine) as session:
+        processed = run_refresh(session, batch_size=args.batch_size)
+    print(f"✅ {processed} compras agregadas en el resumen diario por categoría.")
+
+
+def recount_counters(args):
+    from app.jobs.counters import recount_platform_counters
+    with Session(engine) as session:
+        counters = recount_platform_counters(session)
+    print(f"✅ Contadores recalculados: {counters.total_users} usuarios, {counters.total_products} productos, "
+          f"{counters.total_sales} ventas, ${counters.total_revenue}.")
+
+
+def rebuild_trending(args):
+    from app.core.trending import trending
+    from app.jobs.trending import rebuild_trending as run_rebuild
+    with Session(engine) as session:
+        scored = run_rebuild(session, trending, days=args.days, batch_size=args.batch_size)
+    print(f"✅ Ranking de tendencias reconstruido: {scored} productos puntuados.")
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_search(args):
+    import os
+    import random
+    import tempfile
+    import time
+    from datetime import datetime
+    from sqlalchemy import insert
+    from sqlmodel import SQLModel, create_engine, select
+    from app.core.text_search import install_text_search, text_search_clause
+    from app.models.products import Product
+    from app.models.users import User
+    from app.routers.search import run_search
+
+    # Base de datos desechable: el benchmark inserta hasta max(sizes) productos
+    path = os.path.join(tempfile.gettempdir(), f"vesta-bench-search-{os.getpid()}.db")
+    bench_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(bench_engine)
+    with bench_engine.begin() as connection:
+        install_text_search(connection)
+
+    rng = random.Random(42)
+    vocabulary = [f"w{i}" for i in range(args.vocabulary)]
+    words = lambda n: " ".join(rng.choice(vocabulary) for _ in range(n))
+
+    def timed(fn):
+        fn(vocabulary[0])  # calienta caché de páginas y plan
+        samples = []
+        for term in rng.sample(vocabulary, args.queries):
+            start = time.perf_counter()
+            fn(term)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    try:
+        with Session(bench_engine) as session:
+            session.add(User(id=1, username="bench", email="bench@example.com", hashed_password="-"))
+            session.commit()
+
+            total = 0
+            for size in sorted(args.sizes):
+                while total < size:
+                    batch = min(10000, size - total)
+                    session.exec(insert(Product), params=[
+                        {"title": words(3), "description": words(12), "price": rng.randint(1, 500),
+                         "owner_id": 1, "created_at": datetime.utcnow(), "like_count": 0}
+                        for _ in range(batch)
+                    ])
+                    session.commit()
+                    total += batch
+
+                def ilike(term):
+                    statement = (
+                        select(Product)
+                        .where(text_search_clause("generic", term)[0])
+                        .order_by(Product.created_at.desc(), Product.id.desc())
+                        .limit(20)
+                    )
+                    session.exec(statement).all()
+
+                runs = {
+                    "fts": timed(lambda term: run_search(session, term, None, None, "newest", None, 20)),
+                    "fts+precio": timed(lambda term: run_search(session, term, 50, 200, "lowest_price", None, 20)),
+                    "ilike": timed(ilike),
+                }
+                for label, samples in runs.items():
+                    print(f"{size:>9,} productos  {label:<11} p50={_percentile(samples, 0.5):7.2f} ms  "
+                          f"p99={_percentile(samples, 0.99):7.2f} ms")
+    finally:
+        bench_engine.dispose()
+        os.remove(path)
+
+
+@contextlib.contextmanager
+def _serve(env: dict, port: int):
+    """Arranca la API con uvicorn en un subproceso y espera a que responda."""
+    import os
+    import subprocess
+    import sys
+    import time
+    import httpx
+
+    # Keep-alive largo: con peticiones lentas el cliente reutilizaba conexiones que uvicorn ya cerraba (ReadError)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--timeout-keep-alive", "60"],
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{base_url}/categories", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("La API no arrancó")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def _load(base_url: str, requests, concurrency: int):
+    """Lanza `requests` ((método, ruta, kwargs)) con `concurrency` en vuelo. Devuelve (segundos, latencias ms, errores)."""
+    import asyncio
+    import time
+    import httpx
+
+    latencies, errors = [], 0
+    limit = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one(method, path, kwargs):
+            nonlocal errors
+            async with limit:
+                start = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code >= 400
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(*request) for request in requests))
+        return time.perf_counter() - start, latencies, errors
+
+
+def _bench_database(products: int, url: Optional[str] = None) -> str:
+    """Crea las tablas y `products` productos en `url` (por defecto, SQLite desechable); devuelve la URL."""
+    import os
+    import tempfile
+    from datetime import datetime
+    from sqlalchemy import insert
+    from sqlmodel import SQLModel, create_engine
+    from app.core.auth_utils import hash_password
+    from app.core.text_search import install_text_search
+    from app.models.products import Product
+    from app.models.users import User
+
+    if url is None:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='vesta-bench-'), 'bench.db')}"
+    bench_engine = create_engine(url)
+    SQLModel.metadata.create_all(bench_engine)
+    with bench_engine.begin() as connection:
+        install_text_search(connection)
+    with Session(bench_engine) as session:
+        session.add(User(id=1, username="bench", email="bench@example.com", hashed_password=hash_password("bench")))
+        session.exec(insert(Product), params=[
+            {"title": f"product {i}", "description": "bench", "price": i % 500, "owner_id": 1,
+             "created_at": datetime.utcnow(), "like_count": 0}
+            for i in range(products)
+        ])
+        session.commit()
+    bench_engine.dispose()
+    return url
+
+
+def bench_async(args):
+    import asyncio
+    import os
+    import tempfile
+
+    url = args.database_url or _bench_database(args.products)
+    env = {"DATABASE_URL": url, "TRENDING_PATH": os.path.join(tempfile.gettempdir(), "vesta-bench-trending.json")}
+    # Cada petición con un rango de precios distinto: ninguna sale de la caché de respuestas
+    requests = [("GET", "/search", {"params": {"min_price": i % 450, "max_price": i % 450 + 50, "limit": 20,
+                                                "sort_by": "lowest_price"}})
+                for i in range(args.requests)]
+    for label, db_async in (("sync", "false"), ("async", "true")):
+        with _serve({**env, "DB_ASYNC": db_async}, args.port) as base_url:
+            elapsed, latencies, errors = asyncio.run(_load(base_url, requests, args.concurrency))
+        print(f"{label:<6} {len(latencies) / elapsed:8.1f} req/s  p50={_percentile(latencies, 0.5):7.1f} ms  "
+              f"p99={_percentile(latencies, 0.99):7.1f} ms  errores={errors}")
+
+
+def bench_login(args):
+    import asyncio
+    import os
+    import tempfile
+
+    url = args.database_url or _bench_database(args.products)
+    env = {"DATABASE_URL": url, "TRENDING_PATH": os.path.join(tempfile.gettempdir(), "vesta-bench-trending.json")}
+    logins = [("POST", "/auth/login", {"data": {"username": "bench", "password": "bench"}})] * args.logins
+    probes = [("GET", "/search", {"params": {"min_price": i % 450, "max_price": i % 450 + 50}})
+              for i in range(args.probes)]
+
+    async def flood(base_url):
+        # Sondas alternando solas y durante la avalancha de logins
+        _, quiet, _ = await _load(base_url, probes, args.probe_concurrency)
+        (login_time, _, rejected), (_, busy, _) = await asyncio.gather(
+            _load(base_url, logins, args.concurrency),
+            _load(base_url, probes, args.probe_concurrency),
+        )
+        return quiet, busy, login_time, rejected
+
+    with _serve(env, args.port) as base_url:
+        quiet, busy, login_time, rejected = asyncio.run(flood(base_url))
+    print(f"logins: {(args.logins - rejected) / login_time:.1f}/s ({rejected} rechazados con la cola llena)")
+    print(f"/search sin logins:   p50={_percentile(quiet, 0.5):7.1f} ms  p99={_percentile(quiet, 0.99):7.1f} ms")
+    print(f"/search con logins:   p50={_percentile(busy, 0.5):7.1f} ms  p99={_percentile(busy, 0.99):7.1f} ms")
+
+
+def bench_checkout(args):
+    import asyncio
+    import os
+    import tempfile
+    from sqlalchemy import func, insert
+    from sqlmodel import create_engine, select
+    from app.core.auth_utils import create_access_token
+    from app.models.interactions import CartItem, Purchase
+    from app.models.users import User
+
+    url = _bench_database(args.products, args.database_url)
+    # Los productos 2..items+1 de _bench_database cuestan 1..items
+    cart_cost = sum(range(1, args.items + 1))
+    bench_engine = create_engine(url)
+    with Session(bench_engine) as session:
+        # Saldo justo para un carrito: un segundo cobro del mismo carrito sería doble gasto
+        session.exec(insert(User), params=[
+            {"id": 100 + i, "username": f"buyer{i}", "email": f"buyer{i}@example.com", "hashed_password": "-",
+             "balance": cart_cost, "reputation": 0, "is_admin": False}
+            for i in range(args.buyers)
+        ])
+        session.exec(insert(CartItem), params=[
+            {"user_id": 100 + i, "product_id": product_id, "quantity": 1}
+            for i in range(args.buyers) for product_id in range(2, args.items + 2)
+        ])
+        session.commit()
+
+    env = {"DATABASE_URL": url, "TRENDING_PATH": os.path.join(tempfile.gettempdir(), "vesta-bench-trending.json")}
+    # Cada comprador lanza `attempts` checkouts a la vez; solo uno puede cobrar
+    requests = [
+        ("POST", "/interactions/checkout",
+         {"headers": {"Authorization": f"Bearer {create_access_token(data={'sub': f'buyer{i}'})}"}})
+        for _ in range(args.attempts) for i in range(args.buyers)
+    ]
+    with _serve(env, args.port) as base_url:
+        elapsed, latencies, rejected = asyncio.run(_load(base_url, requests, args.concurrency))
+
+    with Session(bench_engine) as session:
+        buyers = User.id >= 100
+        paid = session.exec(select(func.count()).where(buyers, User.balance == 0)).one()
+        negative = session.exec(select(func.count()).where(buyers, User.balance < 0)).one()
+        purchases = session.exec(select(func.count()).select_from(Purchase)).one()
+    bench_engine.dispose()
+    print(f"checkout: {len(requests) / elapsed:.1f} peticiones/s, {paid / elapsed:.1f} compras/s  "
+          f"p50={_percentile(latencies, 0.5):7.1f} ms  p99={_percentile(latencies, 0.99):7.1f} ms")
+    print(f"compras={paid}/{args.buyers}  rechazadas={rejected}  saldos negativos={negative}  "
+          f"filas Purchase={purchases} (esperadas {paid * args.items})")
+
+
+def bench_export(args):
+    import os
+    import random
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+    from datetime import datetime
+    from sqlalchemy import insert
+    from sqlmodel import SQLModel, create_engine
+    from app import database
+    from app.core.export import stream_export
+    from app.models.interactions import Purchase
+    from app.routers.admin import PURCHASE_EXPORT_COLUMNS
+
+    path = os.path.join(tempfile.gettempdir(), f"vesta-bench-export-{os.getpid()}.db")
+    bench_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(bench_engine)
+    rng = random.Random(42)
+    try:
+        with Session(bench_engine) as session:
+            for start in range(0, args.rows, 10000):
+                session.exec(insert(Purchase), params=[
+                    {"user_id": rng.randint(1, 1000), "product_id": rng.randint(1, 5000), "quantity": 1,
+                     "price_at_purchase": rng.randint(1, 500), "purchase_date": datetime.utcnow()}
+                    for _ in range(min(10000, args.rows - start))
+                ])
+                session.commit()
+
+        # stream_export abre su propia sesión sobre database.engine
+        database.engine = bench_engine
+        ok = True
+        for fmt in ("ndjson", "csv"):
+            tracemalloc.start()
+            start = time.perf_counter()
+            written = sum(len(chunk) for chunk in stream_export(PURCHASE_EXPORT_COLUMNS, fmt))
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peak_mb = peak / 2**20
+            ok = ok and peak_mb <= args.max_peak_mb
+            print(f"{fmt:<6} {args.rows:,} filas, {written / 2**20:,.0f} MB en {elapsed:.1f} s "
+                  f"({args.rows / elapsed:,.0f} filas/s), pico de memoria {peak_mb:.1f} MB")
+    finally:
+        bench_engine.dispose()
+        os.remove(path)
+    if not ok:
+        sys.exit(f"❌ El pico de memoria superó {args.max_peak_mb} MB")
+    print(f"✅ Pico de memoria por debajo de {args.max_peak_mb} MB.")
+
+
+def _bench_reads(cache, keys, seconds, results):
+    import time
+    reads = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for key in keys:
+            cache.get(key)
+        reads += len(keys)
+    results.put(reads)
+
+
+def bench_shared_cache(args):
+    import multiprocessing
+    import shutil
+    import tempfile
+    from app.core.cache import TTLCache
+    from app.core.shared_cache import SharedMemoryCache
+
+    keys = [f"user-{i}" for i in range(args.keys)]
+    directory = tempfile.mkdtemp(prefix="vesta-bench-")
+    shared = SharedMemoryCache("bench", maxsize=args.keys * 2, ttl=None, slot_bytes=256, directory=directory)
+    memory = TTLCache(maxsize=args.keys * 2, ttl=None)
+    for key in keys:
+        shared.set(key, {"id": key, "is_admin": False})
+        memory.set(key, {"id": key, "is_admin": False})
+
+    ctx = multiprocessing.get_context("fork")
+    try:
+        for label, cache in (("memory (por proceso)", memory), ("shared (mmap)", shared)):
+            results = ctx.Queue()
+            workers = [ctx.Process(target=_bench_reads, args=(cache, keys, args.seconds, results)) for _ in range(args.processes)]
+            for worker in workers:
+                worker.start()
+            total = sum(results.get() for _ in workers)
+            for worker in workers:
+                worker.join()
+            print(f"{label}: {total / args.seconds:,.0f} lecturas/s con {args.processes} procesos")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de VestaAPI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("reconcile-likes", help="Recalcula Product.like_count desde productlike")
+    cmd.add_argument("--batch-size", type=int, default=1000)
+    cmd.add_argument("--dry-run", action="store_true", help="Solo reporta, no corrige")
+    cmd.set_defaults(func=reconcile_likes)
+
+    cmd = commands.add_parser("reconcile-reputation", help="Recalcula User.reputation desde los likes recibidos")
+    cmd.add_argument("--batch-size", type=int, default=1000)
+    cmd.add_argument("--dry-run", action="store_true", help="Solo reporta, no corrige")
+    cmd.set_defaults(func=reconcile_reputation)
+
+    cmd = commands.add_parser("compact-clicks", help="Agrega los ClickEvent nuevos en ClickRollup")
+    cmd.add_argument("--batch-size", type=int, default=10000)
+    cmd.set_defaults(func=compact_clicks)
+
+    cmd = commands.add_parser("refresh-category-sales", help="Agrega las compras nuevas en CategorySalesDaily")
+    cmd.add_argument("--batch-size", type=int, default=10000)
+    cmd.set_defaults(func=refresh_category_sales)
+
+    cmd = commands.add_parser("recount-counters", help="Reconstruye platform_counters desde las tablas")
+    cmd.set_defaults(func=recount_counters)
+
+    cmd = commands.add_parser("rebuild-trending", help="Reconstruye el ranking de tendencias desde compras y clics")
+    cmd.add_argument("--days", type=int, default=7)
+    cmd.add_argument("--batch-size", type=int, default=10000)
+    cmd.set_defaults(func=rebuild_trending)
+
+    cmd = commands.add_parser("bench-search", help="Mide la latencia de /search (FTS frente a ILIKE) según el número de productos")
+    cmd.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    cmd.add_argument("--queries", type=int, default=200)
+    cmd.add_argument("--vocabulary", type=int, default=50000)
+    cmd.set_defaults(func=bench_search)
+
+    cmd = commands.add_parser("bench-async", help="Compara el rendimiento de /search con el motor síncrono y el asíncrono")
+    cmd.add_argument("--database-url", help="Base ya poblada (por defecto, SQLite desechable)")
+    cmd.add_argument("--products", type=int, default=20000)
+    cmd.add_argument("--requests", type=int, default=2000)
+    cmd.add_argument("--concurrency", type=int, default=200)
+    cmd.add_argument("--port", type=int, default=8765)
+    cmd.set_defaults(func=bench_async)
+
+    cmd = commands.add_parser("bench-login", help="Mide logins/s y la latencia de /search durante una avalancha de logins")
+    cmd.add_argument("--database-url", help="Base ya poblada con el usuario bench/bench (por defecto, SQLite desechable)")
+    cmd.add_argument("--products", type=int, default=20000)
+    cmd.add_argument("--logins", type=int, default=200)
+    cmd.add_argument("--concurrency", type=int, default=100)
+    cmd.add_argument("--probes", type=int, default=200)
+    cmd.add_argument("--probe-concurrency", type=int, default=4)
+    cmd.add_argument("--port", type=int, default=8766)
+    cmd.set_defaults(func=bench_login)
+
+    cmd = commands.add_parser("bench-checkout", help="Mide checkouts/s con varios checkouts simultáneos por comprador")
+    cmd.add_argument("--database-url", help="Base vacía donde crear las tablas, p. ej. Postgres (por defecto, SQLite desechable)")
+    cmd.add_argument("--products", type=int, default=1000)
+    cmd.add_argument("--buyers", type=int, default=500)
+    cmd.add_argument("--items", type=int, default=5)
+    cmd.add_argument("--attempts", type=int, default=2)
+    cmd.add_argument("--concurrency", type=int, default=50)
+    cmd.add_argument("--port", type=int, default=8767)
+    cmd.set_defaults(func=bench_checkout)
+
+    cmd = commands.add_parser("bench-export", help="Exporta N compras en streaming y comprueba el pico de memoria")
+    cmd.add_argument("--rows", type=int, default=1000000)
+    cmd.add_argument("--max-peak-mb", type=float, default=20.0)
+    cmd.set_defaults(func=bench_export)
+
+    cmd = commands.add_parser("bench-shared-cache", help="Mide lecturas/s de la caché compartida con varios procesos")
+    cmd.add_argument("--processes", type=int, default=4)
+    cmd.add_argument("--seconds", type=float, default=3.0)
+    cmd.add_argument("--keys", type=int, default=1000)
+    cmd.set_defaults(func=bench_shared_cache)
+
+    from app.jobs.retention import CLICK_ARCHIVE_DIR, CLICK_RETENTION_MONTHS
+    cmd = commands.add_parser("archive-clicks", help="Archiva y elimina los clics anteriores al horizonte de retención")
+    cmd.add_argument("--months", type=int, default=CLICK_RETENTION_MONTHS)
+    cmd.add_argument("--archive-dir", default=CLICK_ARCHIVE_DIR)
+    cmd.set_defaults(func=archive_clicks)
+
+    cmd = commands.add_parser("rebuild-rollups", help="Reconstruye ClickRollup desde los archivos y la tabla viva")
+    cmd.add_argument("--archive-dir", default=CLICK_ARCHIVE_DIR)
+    cmd.add_argument("--batch-size", type=int, default=10000)
+    cmd.set_defaults(func=rebuild_rollups)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
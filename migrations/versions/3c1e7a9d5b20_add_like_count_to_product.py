@@ -0,0 +1,56 @@
+"""add like_count to product
+
+Revision ID: 3c1e7a9d5b20
+Revises: 6fb5cb200f37
+Create Date: 2026-10-18 09:12:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1e7a9d5b20'
+down_revision: Union[str, Sequence[str], None] = '6fb5cb200f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tamaño del lote para el backfill (rango de IDs de producto por UPDATE)
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Columna nueva permitiendo NULL para no bloquear la tabla
+    op.add_column('product', sa.Column('like_count', sa.Integer(), nullable=True))
+
+    # 2. Backfill por lotes de IDs, cada uno en su propia transacción: fuera del bloque
+    #    autocommit el lock del ADD COLUMN se mantendría durante todo el backfill
+    like_count_sql = (
+        "UPDATE product SET like_count = ("
+        "SELECT COUNT(*) FROM productlike WHERE productlike.product_id = product.id"
+        ")"
+    )
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        min_id, max_id = bind.execute(sa.text("SELECT MIN(id), MAX(id) FROM product")).one()
+        if min_id is not None:
+            start = min_id
+            while start <= max_id:
+                bind.execute(
+                    sa.text(like_count_sql + " WHERE id >= :start AND id < :end"),
+                    {"start": start, "end": start + BATCH_SIZE},
+                )
+                start += BATCH_SIZE
+
+    # 3. Filas creadas durante el backfill, y ya con valores la hacemos NOT NULL
+    op.execute(like_count_sql + ' WHERE like_count IS NULL')
+    op.alter_column('product', 'like_count', nullable=False, server_default='0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('product', 'like_count')
@@ -0,0 +1,31 @@
+"""add product keyset indexes
+
+Revision ID: 8d4f2b6e1a73
+Revises: 3c1e7a9d5b20
+Create Date: 2026-10-18 10:03:27.542019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2b6e1a73'
+down_revision: Union[str, Sequence[str], None] = '3c1e7a9d5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_product_created_at_id', 'product', ['created_at', 'id'], unique=False)
+    op.create_index('ix_product_price_id', 'product', ['price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_product_price_id', table_name='product')
+    op.drop_index('ix_product_created_at_id', table_name='product')
@@ -0,0 +1,37 @@
+"""add inserted_at to clickevent
+
+Revision ID: 9b3d5f7a1c26
+Revises: d2f5a7c83e19
+Create Date: 2026-10-19 10:04:51.276310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3d5f7a1c26'
+down_revision: Union[str, Sequence[str], None] = 'd2f5a7c83e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Hora UTC del INSERT según la base; las filas existentes reciben la de la migración
+    if op.get_bind().dialect.name == 'postgresql':
+        default = sa.text("timezone('utc', now())")
+    else:
+        default = sa.text('CURRENT_TIMESTAMP')
+    # batch: SQLite no admite ADD COLUMN con un default no constante y reconstruye la tabla
+    with op.batch_alter_table('clickevent') as batch_op:
+        batch_op.add_column(sa.Column('inserted_at', sa.DateTime(), nullable=False, server_default=default))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('clickevent') as batch_op:
+        batch_op.drop_column('inserted_at')
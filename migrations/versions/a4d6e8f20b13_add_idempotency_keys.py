@@ -0,0 +1,38 @@
+"""add idempotency keys
+
+Revision ID: a4d6e8f20b13
+Revises: f3a8c1d09e62
+Create Date: 2026-10-18 17:48:26.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6e8f20b13'
+down_revision: Union[str, Sequence[str], None] = 'f3a8c1d09e62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('idempotencykey',
+        sa.Column('key_hash', sa.LargeBinary(), nullable=False),
+        sa.Column('fingerprint', sa.LargeBinary(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=False),
+        sa.Column('response', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key_hash')
+    )
+    op.create_index(op.f('ix_idempotencykey_expires_at'), 'idempotencykey', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_idempotencykey_expires_at'), table_name='idempotencykey')
+    op.drop_table('idempotencykey')
@@ -0,0 +1,67 @@
+"""add product full text search
+
+Revision ID: a7e3c5f91d42
+Revises: 8d4f2b6e1a73
+Create Date: 2026-10-18 11:20:54.903318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c5f91d42'
+down_revision: Union[str, Sequence[str], None] = '8d4f2b6e1a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Columna generada: Postgres la recalcula en cada INSERT/UPDATE
+        op.execute(
+            "ALTER TABLE product ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+            ") STORED"
+        )
+        op.execute("CREATE INDEX ix_product_search_vector ON product USING GIN (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE product_fts USING fts5("
+            "title, description, content='product', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER product_fts_ai AFTER INSERT ON product BEGIN "
+            "INSERT INTO product_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER product_fts_ad AFTER DELETE ON product BEGIN "
+            "INSERT INTO product_fts(product_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER product_fts_au AFTER UPDATE OF title, description ON product BEGIN "
+            "INSERT INTO product_fts(product_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO product_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+        )
+        op.execute("INSERT INTO product_fts(product_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_product_search_vector")
+        op.execute("ALTER TABLE product DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        for trigger in ('product_fts_ai', 'product_fts_ad', 'product_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS product_fts")
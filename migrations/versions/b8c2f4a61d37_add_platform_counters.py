@@ -0,0 +1,47 @@
+"""add platform counters
+
+Revision ID: b8c2f4a61d37
+Revises: a4d6e8f20b13
+Create Date: 2026-10-18 18:31:54.120478
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c2f4a61d37'
+down_revision: Union[str, Sequence[str], None] = 'a4d6e8f20b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('platform_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('total_users', sa.Integer(), nullable=False),
+        sa.Column('total_products', sa.Integer(), nullable=False),
+        sa.Column('total_sales', sa.Integer(), nullable=False),
+        sa.Column('total_revenue', sa.Float(), nullable=False),
+        sa.Column('recounted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Fila inicial con los totales actuales
+    op.execute(
+        'INSERT INTO platform_counters (id, total_users, total_products, total_sales, total_revenue, recounted_at) '
+        'SELECT 1, '
+        '(SELECT COUNT(*) FROM "user"), '
+        '(SELECT COUNT(*) FROM product), '
+        '(SELECT COUNT(*) FROM purchase), '
+        '(SELECT COALESCE(SUM(price_at_purchase * quantity), 0) FROM purchase), '
+        'CURRENT_TIMESTAMP'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('platform_counters')
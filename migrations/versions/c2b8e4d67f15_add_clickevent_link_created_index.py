@@ -0,0 +1,29 @@
+"""add clickevent link_id created_at index
+
+Revision ID: c2b8e4d67f15
+Revises: a7e3c5f91d42
+Create Date: 2026-10-18 13:41:09.260517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2b8e4d67f15'
+down_revision: Union[str, Sequence[str], None] = 'a7e3c5f91d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_clickevent_link_id_created_at', 'clickevent', ['link_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_clickevent_link_id_created_at', table_name='clickevent')
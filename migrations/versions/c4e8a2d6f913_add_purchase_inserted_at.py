@@ -0,0 +1,37 @@
+"""add inserted_at to purchase
+
+Revision ID: c4e8a2d6f913
+Revises: 9b3d5f7a1c26
+Create Date: 2026-10-20 09:12:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f913'
+down_revision: Union[str, Sequence[str], None] = '9b3d5f7a1c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Hora UTC del INSERT según la base; las filas existentes reciben la de la migración
+    if op.get_bind().dialect.name == 'postgresql':
+        default = sa.text("timezone('utc', now())")
+    else:
+        default = sa.text('CURRENT_TIMESTAMP')
+    # batch: SQLite no admite ADD COLUMN con un default no constante y reconstruye la tabla
+    with op.batch_alter_table('purchase') as batch_op:
+        batch_op.add_column(sa.Column('inserted_at', sa.DateTime(), nullable=False, server_default=default))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('purchase') as batch_op:
+        batch_op.drop_column('inserted_at')
@@ -0,0 +1,37 @@
+"""add category sales daily
+
+Revision ID: c7e1d3b95a48
+Revises: b8c2f4a61d37
+Create Date: 2026-10-18 19:12:40.557391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1d3b95a48'
+down_revision: Union[str, Sequence[str], None] = 'b8c2f4a61d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Se rellena con `python manage.py refresh-category-sales`
+    op.create_table('categorysalesdaily',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('sales', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id'], ),
+        sa.PrimaryKeyConstraint('category_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('categorysalesdaily')
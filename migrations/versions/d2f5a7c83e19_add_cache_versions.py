@@ -0,0 +1,33 @@
+"""add cache versions
+
+Revision ID: d2f5a7c83e19
+Revises: c7e1d3b95a48
+Create Date: 2026-10-18 20:03:17.842265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f5a7c83e19'
+down_revision: Union[str, Sequence[str], None] = 'c7e1d3b95a48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cacheversion',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cacheversion')
@@ -0,0 +1,43 @@
+"""add click rollups and job watermarks
+
+Revision ID: d9a1f3c7b284
+Revises: c2b8e4d67f15
+Create Date: 2026-10-18 15:02:48.731164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a1f3c7b284'
+down_revision: Union[str, Sequence[str], None] = 'c2b8e4d67f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobwatermark',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('clickrollup',
+        sa.Column('link_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('clicks', sa.Integer(), nullable=False),
+        sa.Column('users_sketch', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['link_id'], ['affiliatelink.id'], ),
+        sa.PrimaryKeyConstraint('link_id', 'bucket_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('clickrollup')
+    op.drop_table('jobwatermark')
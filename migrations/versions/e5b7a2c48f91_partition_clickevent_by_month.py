@@ -0,0 +1,96 @@
+"""partition clickevent by month
+
+Revision ID: e5b7a2c48f91
+Revises: d9a1f3c7b284
+Create Date: 2026-10-18 16:20:37.418902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7a2c48f91'
+down_revision: Union[str, Sequence[str], None] = 'd9a1f3c7b284'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CLICKEVENT_COLUMNS = "id, link_id, user_id, referrer, created_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect != 'postgresql':
+        # Sin particiones nativas: el archivado borra por rangos de created_at
+        op.create_index('ix_clickevent_created_at', 'clickevent', ['created_at'], unique=False)
+        return
+
+    op.execute("ALTER TABLE clickevent RENAME TO clickevent_legacy")
+    op.execute("ALTER INDEX clickevent_pkey RENAME TO clickevent_legacy_pkey")
+    op.execute("ALTER INDEX ix_clickevent_link_id_created_at RENAME TO ix_clickevent_legacy_link_id_created_at")
+    op.execute("ALTER SEQUENCE clickevent_id_seq OWNED BY NONE")
+
+    # La clave de partición tiene que formar parte de la PK
+    op.execute(
+        "CREATE TABLE clickevent ("
+        "id INTEGER NOT NULL DEFAULT nextval('clickevent_id_seq'), "
+        "link_id INTEGER NOT NULL REFERENCES affiliatelink (id), "
+        "user_id INTEGER REFERENCES \"user\" (id), "
+        "referrer VARCHAR, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+        "PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER SEQUENCE clickevent_id_seq OWNED BY clickevent.id")
+    op.execute("CREATE INDEX ix_clickevent_link_id_created_at ON clickevent (link_id, created_at)")
+    op.execute("CREATE INDEX ix_clickevent_created_at ON clickevent (created_at)")
+
+    # Una partición por mes desde el clic más antiguo hasta dos meses por delante;
+    # a partir de ahí las crea app.jobs.retention.ensure_click_partitions
+    op.execute(
+        "DO $$ "
+        "DECLARE m date; stop date; "
+        "BEGIN "
+        "SELECT date_trunc('month', coalesce(min(created_at), now()))::date INTO m FROM clickevent_legacy; "
+        "stop := (date_trunc('month', now()) + interval '3 months')::date; "
+        "WHILE m < stop LOOP "
+        "EXECUTE format('CREATE TABLE %I PARTITION OF clickevent FOR VALUES FROM (%L) TO (%L)', "
+        "'clickevent_p' || to_char(m, 'YYYY_MM'), m, (m + interval '1 month')::date); "
+        "m := (m + interval '1 month')::date; "
+        "END LOOP; "
+        "END $$"
+    )
+    op.execute("CREATE TABLE clickevent_default PARTITION OF clickevent DEFAULT")
+
+    op.execute(f"INSERT INTO clickevent ({CLICKEVENT_COLUMNS}) SELECT {CLICKEVENT_COLUMNS} FROM clickevent_legacy")
+    op.execute("DROP TABLE clickevent_legacy")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect != 'postgresql':
+        op.drop_index('ix_clickevent_created_at', table_name='clickevent')
+        return
+
+    op.execute("ALTER TABLE clickevent RENAME TO clickevent_partitioned")
+    op.execute("ALTER INDEX ix_clickevent_link_id_created_at RENAME TO ix_clickevent_partitioned_link_id_created_at")
+    op.execute("ALTER SEQUENCE clickevent_id_seq OWNED BY NONE")
+    op.execute(
+        "CREATE TABLE clickevent ("
+        "id INTEGER NOT NULL DEFAULT nextval('clickevent_id_seq') PRIMARY KEY, "
+        "link_id INTEGER NOT NULL REFERENCES affiliatelink (id), "
+        "user_id INTEGER REFERENCES \"user\" (id), "
+        "referrer VARCHAR, "
+        "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL"
+        ")"
+    )
+    op.execute("ALTER SEQUENCE clickevent_id_seq OWNED BY clickevent.id")
+    op.execute(f"INSERT INTO clickevent ({CLICKEVENT_COLUMNS}) SELECT {CLICKEVENT_COLUMNS} FROM clickevent_partitioned")
+    op.execute("DROP TABLE clickevent_partitioned CASCADE")
+    op.execute("CREATE INDEX ix_clickevent_link_id_created_at ON clickevent (link_id, created_at)")
@@ -0,0 +1,30 @@
+"""add quantity to purchase
+
+Revision ID: f3a8c1d09e62
+Revises: e5b7a2c48f91
+Create Date: 2026-10-18 17:05:12.634027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c1d09e62'
+down_revision: Union[str, Sequence[str], None] = 'e5b7a2c48f91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las compras anteriores se registraban una por producto
+    op.add_column('purchase', sa.Column('quantity', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('purchase', 'quantity')
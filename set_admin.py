@@ -1,6 +1,8 @@
 from sqlmodel import Session, select
 from app.database import engine
 from app.models.users import User
+from app.core.security import invalidate_cached_user
+from app.core.versions import bump_versions, user_version
 
 def make_admin(username: str):
     with Session(engine) as session:
@@ -9,7 +11,11 @@ def make_admin(username: str):
         if user:
             user.is_admin = True
             session.add(user)
+            bump_versions(session, user_version(user.id))
             session.commit()
+            # Con CACHE_BACKEND=shared y el mismo SHARED_CACHE_DIR llega a todos los workers;
+            # con la caché en memoria solo afecta a este proceso (en los workers caduca por USER_CACHE_TTL)
+            invalidate_cached_user(username)
             print(f"¡{username} ahora es Administrador! 🚀")
         else:
             print("Usuario no encontrado.")
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import uuid
+
+# La app lee la configuración al importarse: base de datos y ficheros en un directorio temporal
+TMP_DIR = tempfile.mkdtemp(prefix="vesta-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'test.db')}"
+os.environ.setdefault("TRENDING_PATH", os.path.join(TMP_DIR, "trending.json"))
+os.environ.setdefault("CLICK_ARCHIVE_DIR", os.path.join(TMP_DIR, "click_archive"))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+from app import database
+from app.core.auth_utils import create_access_token
+from app.models import Product, User
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Con el context manager se ejecutan startup/shutdown (tablas, cachés, hilos de fondo)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def session(client):
+    with Session(database.engine) as db_session:
+        yield db_session
+
+
+@pytest.fixture
+def make_user(session):
+    def _make_user(balance: float = 0, is_admin: bool = False) -> User:
+        name = f"user-{uuid.uuid4().hex[:12]}"
+        user = User(username=name, email=f"{name}@example.com", hashed_password="-",
+                    balance=balance, is_admin=is_admin)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def make_products(session):
+    def _make_products(owner: User, count: int, price: float = 10) -> list:
+        products = [Product(title=f"product {i}", description="test", price=price, owner_id=owner.id)
+                    for i in range(count)]
+        session.add_all(products)
+        session.commit()
+        return [product.id for product in products]
+    return _make_products
+
+
+def auth_headers(user: User) -> dict:
+    # Token firmado directamente: evita bcrypt en cada test
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user.username})}"}
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL que llegan al motor mientras está activo."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
@@ -0,0 +1,38 @@
+import time
+from app.core.versions import bump_versions
+from app.models.affiliates import AffiliateLink
+from app.routers.affiliates import AFFILIATE_LINKS_VERSION, link_cache, link_cache_watcher
+from tests.conftest import auth_headers
+
+
+def _create_link(client, owner, product_id):
+    response = client.post("/affiliates", headers=auth_headers(owner),
+                           json={"url": "https://shop.example.com", "platform_name": "shop", "product_id": product_id})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_deactivation_from_another_worker_reaches_this_cache(client, session, make_user, make_products):
+    owner = make_user()
+    link_id = _create_link(client, owner, make_products(owner, 1)[0])
+    assert client.get(f"/affiliates/go/{link_id}", follow_redirects=False).status_code == 307
+    assert link_cache.get(link_id).is_active
+
+    # Otro worker desactiva el link: aquí solo cambia la fila y la versión
+    link_cache_watcher.check()
+    link = session.get(AffiliateLink, link_id)
+    link.is_active = False
+    session.add(link)
+    bump_versions(session, AFFILIATE_LINKS_VERSION)
+    session.commit()
+
+    assert link_cache_watcher.check()
+    assert client.get(f"/affiliates/go/{link_id}", follow_redirects=False).status_code == 404
+
+
+def test_unknown_links_are_cached_briefly(client, monkeypatch):
+    import app.routers.affiliates as affiliates
+    monkeypatch.setattr(affiliates, "AFFILIATE_LINK_NEGATIVE_TTL", 0.01)
+    assert client.get("/affiliates/go/999999", follow_redirects=False).status_code == 404
+    time.sleep(0.02)
+    assert link_cache.get(999999) is None
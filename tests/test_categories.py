@@ -0,0 +1,38 @@
+import hashlib
+import threading
+import uuid
+from app.core.catalog import category_catalog
+from tests.conftest import auth_headers
+
+
+def _etag_of(body):
+    return '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def test_catalog_body_and_etag_are_swapped_together(client, session, make_user):
+    admin = make_user(is_admin=True)
+    stop = threading.Event()
+    mismatches = []
+
+    def read():
+        while not stop.is_set():
+            body, etag = category_catalog.snapshot
+            if etag and etag != _etag_of(body):
+                mismatches.append(etag)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(5):
+            name = f"cat-{uuid.uuid4().hex}"
+            created = client.post("/categories", headers=auth_headers(admin),
+                                  json={"name": name, "slug": name})
+            assert created.status_code == 201
+    finally:
+        stop.set()
+        reader.join()
+    assert mismatches == []
+
+    response = client.get("/categories")
+    assert response.headers["ETag"] == _etag_of(response.content)
+    assert name in response.text
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func
+from sqlmodel import select
+from app.models import User
+from app.models.interactions import CartItem, Purchase
+from app.models.products import Product
+from main import app
+from tests.conftest import auth_headers
+
+PARALLEL_CHECKOUTS = 8
+ROUNDS = 5
+
+
+def _checkout(headers):
+    # Un cliente por hilo: las peticiones llegan de verdad en paralelo
+    return TestClient(app).post("/interactions/checkout", headers=headers).status_code
+
+
+def test_concurrent_checkouts_never_double_spend(client, session, make_user, make_products):
+    owner = make_user()
+    buyer = make_user(balance=35)
+    product_id = make_products(owner, 1, price=10)[0]
+    headers = auth_headers(buyer)
+
+    successes = 0
+    with ThreadPoolExecutor(PARALLEL_CHECKOUTS) as pool:
+        for _ in range(ROUNDS):
+            session.add(CartItem(user_id=buyer.id, product_id=product_id, quantity=1))
+            session.commit()
+            statuses = list(pool.map(_checkout, [headers] * PARALLEL_CHECKOUTS))
+            # Un carrito solo se puede comprar una vez; el resto ve el carrito vacío o sin saldo
+            assert statuses.count(200) <= 1
+            assert set(statuses) <= {200, 400}
+            successes += statuses.count(200)
+            # Sin saldo el checkout hace rollback y el carrito sigue ahí
+            leftover = session.get(CartItem, (buyer.id, product_id))
+            if leftover is not None:
+                session.delete(leftover)
+                session.commit()
+
+    session.expire_all()
+    balance = session.get(User, buyer.id).balance
+    spent = session.exec(
+        select(func.coalesce(func.sum(Purchase.price_at_purchase * Purchase.quantity), 0))
+        .where(Purchase.user_id == buyer.id)
+    ).one()
+    assert successes == 3
+    assert balance == 5
+    assert spent == 35 - balance
+
+
+def _top_up(admin_headers, user_id):
+    return TestClient(app).post(f"/admin/users/{user_id}/add-balance?amount=1", headers=admin_headers).status_code
+
+
+def test_top_ups_during_checkouts_are_not_lost(client, session, make_user, make_products):
+    admin = make_user(is_admin=True)
+    owner = make_user()
+    buyer = make_user(balance=100)
+    product_id = make_products(owner, 1, price=10)[0]
+
+    checkouts = top_ups = 0
+    with ThreadPoolExecutor(PARALLEL_CHECKOUTS) as pool:
+        for _ in range(ROUNDS):
+            session.add(CartItem(user_id=buyer.id, product_id=product_id, quantity=1))
+            session.commit()
+            jobs = [pool.submit(_checkout, auth_headers(buyer))]
+            jobs += [pool.submit(_top_up, auth_headers(admin), buyer.id) for _ in range(PARALLEL_CHECKOUTS - 1)]
+            statuses = [job.result() for job in jobs]
+            checkouts += statuses[0] == 200
+            top_ups += statuses[1:].count(200)
+
+    session.expire_all()
+    assert session.get(User, buyer.id).balance == 100 + top_ups - 10 * checkouts
+
+
+def test_checkout_with_deleted_product_is_rejected(client, session, make_user, make_products):
+    owner = make_user()
+    buyer = make_user(balance=100)
+    kept, deleted = make_products(owner, 2, price=10)
+    session.add(CartItem(user_id=buyer.id, product_id=kept, quantity=1))
+    session.add(CartItem(user_id=buyer.id, product_id=deleted, quantity=1))
+    session.commit()
+    session.exec(delete(Product).where(Product.id == deleted))
+    session.commit()
+
+    response = client.post("/interactions/checkout", headers=auth_headers(buyer))
+    assert response.status_code == 409
+    session.expire_all()
+    # Nada cobrado y el carrito intacto para que el usuario lo revise
+    assert session.get(User, buyer.id).balance == 100
+    assert session.get(CartItem, (buyer.id, kept)) is not None
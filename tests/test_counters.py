@@ -0,0 +1,44 @@
+from sqlalchemy import delete
+from sqlmodel import Session, select, func
+from app import database
+from app.core.counters import COUNTER_SHARDS, bump_counters, read_counters
+from app.jobs.counters import recount_platform_counters
+from app.models.stats import PlatformCounters
+from tests.conftest import auth_headers
+
+
+def test_counters_are_sharded_and_summed_on_read(client, session, make_user):
+    admin = make_user(is_admin=True)
+    recount_platform_counters(session)
+    before = client.get("/admin/stats", headers=auth_headers(admin)).json()
+
+    for _ in range(20):
+        with Session(database.engine) as other:
+            bump_counters(other, total_sales=1, total_revenue=2.5)
+            other.commit()
+    # Cada sesión elige un shard: las filas se crean con upsert y se suman al leer
+    assert session.exec(select(func.count(PlatformCounters.id))).one() > 1
+
+    after = client.get("/admin/stats", headers=auth_headers(admin)).json()
+    assert after["total_sales"] == before["total_sales"] + 20
+    assert after["total_revenue"] == before["total_revenue"] + 50
+
+
+def test_recount_folds_shards_into_one_row(client, session, make_user):
+    owner = make_user()
+    client.post("/products", headers=auth_headers(owner),
+                json={"title": "counted", "description": "x", "price": 3})
+
+    recounted = recount_platform_counters(session)
+    assert read_counters(session) == recounted.model_dump(include={"total_users", "total_products", "total_sales", "total_revenue"})
+    assert session.exec(select(func.count(PlatformCounters.id)).where(PlatformCounters.total_users != 0)).one() == 1
+
+
+def test_recount_creates_every_shard_before_locking(session):
+    session.exec(delete(PlatformCounters).where(PlatformCounters.id != 0))
+    session.commit()
+
+    recount_platform_counters(session)
+    ids = set(session.exec(select(PlatformCounters.id)).all())
+    # Ningún bump posterior puede crear un shard que el recuento no tuviese bloqueado
+    assert set(range(COUNTER_SHARDS)) <= ids
@@ -0,0 +1,51 @@
+import json
+import tracemalloc
+from datetime import datetime
+from sqlalchemy import insert
+from app.core.export import stream_export
+from app.models.interactions import Purchase
+from app.routers.admin import PURCHASE_EXPORT_COLUMNS
+from tests.conftest import auth_headers
+
+ROWS = 30000
+
+
+def test_purchase_export_streams_in_bounded_memory(session, make_user, make_products):
+    buyer = make_user()
+    product_id = make_products(make_user(), 1)[0]
+    session.exec(insert(Purchase), params=[
+        {"user_id": buyer.id, "product_id": product_id, "quantity": 1,
+         "price_at_purchase": 10, "purchase_date": datetime.utcnow()}
+        for _ in range(ROWS)
+    ])
+    session.commit()
+
+    tracemalloc.start()
+    lines = 0
+    written = 0
+    for chunk in stream_export(PURCHASE_EXPORT_COLUMNS, "ndjson", Purchase.user_id == buyer.id):
+        lines += chunk.count("\n")
+        written += len(chunk)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert lines == ROWS
+    # El volcado ocupa varios MB; el pico se queda en unos pocos lotes
+    assert written > 3 * 2**20
+    assert peak < 3 * 2**20
+
+
+def test_export_endpoint_formats(client, session, make_user, make_products):
+    admin = make_user(is_admin=True)
+    buyer = make_user()
+    session.add(Purchase(user_id=buyer.id, product_id=make_products(admin, 1)[0], quantity=2, price_at_purchase=4))
+    session.commit()
+
+    ndjson = client.get(f"/admin/export/purchases?user_id={buyer.id}", headers=auth_headers(admin))
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    assert json.loads(ndjson.text.splitlines()[0])["quantity"] == 2
+
+    csv = client.get(f"/admin/export/purchases?user_id={buyer.id}&format=csv", headers=auth_headers(admin))
+    header, row = csv.text.splitlines()
+    assert header == "id,user_id,product_id,quantity,price_at_purchase,purchase_date"
+    assert row.split(",")[3] == "2"
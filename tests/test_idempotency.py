@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlmodel import select
+from app.models import User
+from app.models.interactions import CartItem, Purchase
+from main import app
+from tests.conftest import auth_headers
+
+
+def _checkout(headers):
+    response = TestClient(app).post("/interactions/checkout", headers=headers)
+    return response.status_code, response.json()
+
+
+def test_concurrent_retries_replay_the_original_checkout(client, session, make_user, make_products):
+    owner = make_user()
+    buyer = make_user(balance=100)
+    product_id = make_products(owner, 1, price=10)[0]
+    session.add(CartItem(user_id=buyer.id, product_id=product_id, quantity=2))
+    session.commit()
+    headers = {**auth_headers(buyer), "Idempotency-Key": "checkout-retry-1"}
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(_checkout, [headers] * 4))
+
+    # Todos los reintentos ven la respuesta de la compra original, no "carrito vacío"
+    assert [status for status, _ in results] == [200] * 4
+    assert all(body == results[0][1] for _, body in results)
+    assert results[0][1]["total_paid"] == 20
+    purchases = session.exec(select(func.count(Purchase.id)).where(Purchase.user_id == buyer.id)).one()
+    assert purchases == 1
+    session.expire_all()
+    assert session.get(User, buyer.id).balance == 80
+
+
+def test_failed_request_does_not_keep_the_key(client, make_user):
+    buyer = make_user(balance=100)
+    headers = {**auth_headers(buyer), "Idempotency-Key": "empty-cart-1"}
+    assert client.post("/interactions/checkout", headers=headers).status_code == 400
+    assert client.post("/interactions/checkout", headers=headers).status_code == 400
+
+
+def test_key_reused_for_another_request_is_rejected(client, make_user):
+    admin = make_user(is_admin=True)
+    target = make_user()
+    headers = {**auth_headers(admin), "Idempotency-Key": "topup-1"}
+    first = client.post(f"/admin/users/{target.id}/add-balance?amount=5", headers=headers)
+    again = client.post(f"/admin/users/{target.id}/add-balance?amount=5", headers=headers)
+    other = client.post(f"/admin/users/{target.id}/add-balance?amount=7", headers=headers)
+    assert first.status_code == again.status_code == 200
+    assert again.json() == first.json()
+    assert other.status_code == 422
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy import func, update
+from sqlmodel import select
+from app.jobs.likes import reconcile_like_counts
+from app.jobs.reputation import reconcile_reputation
+from app.models import Product, ProductLike, User
+from main import app
+from tests.conftest import auth_headers
+
+
+def test_reconcile_like_counts_fixes_drift(session, make_user, make_products):
+    owner = make_user()
+    fans = [make_user() for _ in range(3)]
+    liked, untouched = make_products(owner, 2)
+    session.add_all(ProductLike(user_id=fan.id, product_id=liked) for fan in fans)
+    session.exec(update(Product).where(Product.id == liked).values(like_count=7))
+    session.commit()
+
+    report = reconcile_like_counts(session, fix=False)
+    assert (liked, 7, 3) in report
+    assert session.get(Product, liked).like_count == 7
+
+    drift = reconcile_like_counts(session, batch_size=1)
+    assert (liked, 7, 3) in drift
+    assert all(pid != untouched for pid, _, _ in drift)
+    session.expire_all()
+    assert session.get(Product, liked).like_count == 3
+
+
+def test_deleting_a_liked_product_updates_owner_reputation(client, session, make_user, make_products):
+    owner = make_user()
+    kept, deleted = make_products(owner, 2)
+    for fan in (make_user(), make_user()):
+        client.post(f"/products/{deleted}/like", headers=auth_headers(fan))
+    client.post(f"/products/{kept}/like", headers=auth_headers(make_user()))
+    session.refresh(owner)
+    assert owner.reputation == 3
+
+    assert client.delete(f"/products/{deleted}", headers=auth_headers(owner)).status_code == 200
+    session.refresh(owner)
+    assert owner.reputation == 1
+    assert all(uid != owner.id for uid, _, _ in reconcile_reputation(session, fix=False))
+
+
+def test_reconcile_reputation_fixes_drift(session, make_user, make_products):
+    owner = make_user()
+    product_id = make_products(owner, 1)[0]
+    session.add(ProductLike(user_id=make_user().id, product_id=product_id))
+    session.exec(update(User).where(User.id == owner.id).values(reputation=9))
+    session.commit()
+
+    drift = reconcile_reputation(session, batch_size=2)
+    assert (owner.id, 9, 1) in drift
+    session.expire_all()
+    assert session.get(User, owner.id).reputation == 1
+
+
+def _counters(session, product_id, owner_id):
+    session.expire_all()
+    rows = session.exec(select(func.count()).select_from(ProductLike).where(ProductLike.product_id == product_id)).one()
+    return session.get(Product, product_id).like_count, session.get(User, owner_id).reputation, rows
+
+
+def test_toggling_twice_keeps_counters_in_sync(client, session, make_user, make_products):
+    owner = make_user()
+    fan = make_user()
+    product_id = make_products(owner, 1)[0]
+    headers = auth_headers(fan)
+
+    for url in (f"/products/{product_id}/like", f"/interactions/like/{product_id}"):
+        assert client.post(url, headers=headers).json()["likes_count"] == 1
+        assert _counters(session, product_id, owner.id) == (1, 1, 1)
+        assert client.post(url, headers=headers).json()["likes_count"] == 0
+        assert _counters(session, product_id, owner.id) == (0, 0, 0)
+
+
+def test_concurrent_toggles_match_the_like_rows(client, session, make_user, make_products):
+    owner = make_user()
+    fan = make_user()
+    product_id = make_products(owner, 1)[0]
+    headers = auth_headers(fan)
+
+    def toggle(_):
+        return TestClient(app).post(f"/products/{product_id}/like", headers=headers).status_code
+
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(pool.map(toggle, range(7)))
+    assert statuses == [200] * 7
+    # Impar de toggles: acaba con like, y contador y reputación coinciden con las filas
+    assert _counters(session, product_id, owner.id) == (1, 1, 1)
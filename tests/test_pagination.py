@@ -0,0 +1,25 @@
+import pytest
+from fastapi import HTTPException
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models import Product
+
+PRICE_KEYS = (Product.price, Product.id)
+
+
+def test_decode_cursor_round_trip():
+    token = encode_cursor("lowest_price", [12.5, 7])
+    assert decode_cursor(token, "lowest_price", PRICE_KEYS) == [12.5, 7]
+
+
+@pytest.mark.parametrize("values", [["cheap", 7], [12.5, "7"], [12.5, True], [None, 7], [12.5, 7.5]])
+def test_decode_cursor_rejects_mistyped_values(values):
+    token = encode_cursor("lowest_price", values)
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(token, "lowest_price", PRICE_KEYS)
+    assert exc.value.status_code == 400
+
+
+def test_search_with_tampered_cursor_is_a_400(client):
+    token = encode_cursor("lowest_price", ["cheap", 1])
+    response = client.get(f"/search?sort_by=lowest_price&cursor={token}")
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+from unittest.mock import patch
+from app import database
+from app.core.versions import LIKE_COUNT_MAX_AGE, PRODUCTS_VERSION, read_versions
+from tests.conftest import QueryCounter, auth_headers
+
+
+def _count_queries(client, url, headers=None):
+    # Los pollers de fondo (catálogo, links) usan el mismo motor: el mínimo de varias medidas los descarta
+    counts = []
+    for _ in range(3):
+        with QueryCounter(database.engine) as counter:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        counts.append(counter.count)
+    return min(counts), response.json()
+
+
+def test_list_products_query_count_does_not_grow_with_page_size(client, make_user, make_products, session):
+    owner = make_user()
+    viewer = make_user()
+    product_ids = make_products(owner, 120)
+    client.post(f"/products/{product_ids[0]}/like", headers=auth_headers(viewer))
+
+    headers = auth_headers(viewer)
+    small, small_page = _count_queries(client, "/products?limit=5", headers)
+    large, large_page = _count_queries(client, "/products?limit=100", headers)
+    assert len(small_page["items"]) == 5
+    assert len(large_page["items"]) == 100
+    # Likes y flags del usuario van en lote: el número de consultas no depende del tamaño de página
+    assert small == large
+
+
+def test_like_keeps_other_viewers_etags_until_the_window_moves(client, make_user, make_products, session):
+    owner = make_user()
+    liker = make_user()
+    viewer = make_user()
+    product_id = make_products(owner, 1)[0]
+
+    def etag(user):
+        return client.get("/products?limit=5", headers=auth_headers(user)).headers["ETag"]
+
+    now = 1000 * LIKE_COUNT_MAX_AGE
+    with patch("app.core.versions.time.time", return_value=now):
+        before = read_versions(session, [PRODUCTS_VERSION])
+        liker_etag, viewer_etag = etag(liker), etag(viewer)
+        assert client.post(f"/products/{product_id}/like", headers=auth_headers(liker)).status_code == 200
+
+        # Sin fila global caliente: solo cambian las versiones de quien da el like y del dueño
+        assert read_versions(session, [PRODUCTS_VERSION]) == before
+        assert etag(liker) != liker_etag
+        assert etag(viewer) == viewer_etag
+    with patch("app.core.versions.time.time", return_value=now + LIKE_COUNT_MAX_AGE):
+        assert etag(viewer) != viewer_etag
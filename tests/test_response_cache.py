@@ -0,0 +1,47 @@
+import uuid
+from typing import List
+from starlette.requests import Request
+from app.core.cache import TTLCache
+from app.core.response_cache import ResponseCache
+from app.core.versions import bump_versions
+
+
+def _request(path="/search", query=b"q=x"):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+
+def _worker():
+    # Cada worker de gunicorn tiene su propia caché en memoria
+    return ResponseCache(TTLCache(maxsize=10, ttl=None), max_entry_bytes=1024)
+
+
+def _bump(session, tag):
+    bump_versions(session, tag)
+    session.commit()
+
+
+def test_invalidation_during_query_is_not_cached_as_fresh(session):
+    cache, tags = _worker(), [f"test:{uuid.uuid4().hex}"]
+    tokens = cache.begin(session, tags)
+    assert cache.get(_request(), tokens) is None
+    # Escritura concurrente entre la consulta y el render
+    _bump(session, tags[0])
+    cache.render(_request(), tokens, List[int], [1, 2])
+
+    fresh = cache.begin(session, tags)
+    assert cache.get(_request(), fresh) is None
+    cache.render(_request(), fresh, List[int], [1, 2, 3])
+    hit = cache.get(_request(), cache.begin(session, tags))
+    assert hit is not None and hit.body == b"[1,2,3]"
+
+
+def test_write_on_one_worker_invalidates_the_others(session):
+    first, second, tags = _worker(), _worker(), [f"test:{uuid.uuid4().hex}"]
+    for cache in (first, second):
+        cache.render(_request(), cache.begin(session, tags), List[int], [1])
+        assert cache.get(_request(), cache.begin(session, tags)) is not None
+
+    # La escritura la atiende otro worker: solo toca la BD
+    _bump(session, tags[0])
+    for cache in (first, second):
+        assert cache.get(_request(), cache.begin(session, tags)) is None
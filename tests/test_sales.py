@@ -0,0 +1,33 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
+from sqlmodel import select
+from app.jobs.sales import SAFETY_LAG, refresh_category_sales
+from app.models.categories import Category
+from app.models.interactions import Purchase
+from app.models.products import Product
+from app.models.reports import CategorySalesDaily
+
+
+def test_refresh_waits_for_recently_inserted_purchases(session, make_user, make_products):
+    owner = make_user()
+    category = Category(name=f"cat-{uuid.uuid4().hex}", slug=f"cat-{uuid.uuid4().hex}")
+    session.add(category)
+    session.commit()
+    product_id = make_products(owner, 1, price=4)[0]
+    session.exec(update(Product).where(Product.id == product_id).values(category_id=category.id))
+    session.commit()
+    refresh_category_sales(session, now=datetime.utcnow() + SAFETY_LAG * 2)
+
+    # purchase_date de hace una hora (fijado por la app antes de una transacción lenta) pero insertada ahora
+    purchased_at = datetime.utcnow() - timedelta(hours=1)
+    session.exec(insert(Purchase).values([
+        {"user_id": owner.id, "product_id": product_id, "price_at_purchase": 4, "quantity": 1, "purchase_date": purchased_at}
+        for _ in range(3)
+    ]))
+    session.commit()
+
+    assert refresh_category_sales(session) == 0
+    assert refresh_category_sales(session, now=datetime.utcnow() + SAFETY_LAG + timedelta(seconds=5)) >= 3
+    sales = session.exec(select(CategorySalesDaily.sales).where(CategorySalesDaily.category_id == category.id)).all()
+    assert sum(sales) == 3
@@ -0,0 +1,72 @@
+import os
+from unittest.mock import patch
+import pytest
+from app.core import cache as cache_module
+from app.core.security import UserSnapshot
+from app.core.shared_cache import SharedMemoryCache, remove_cache_files
+
+
+def _cache(directory, slot_bytes=512, name="test"):
+    return SharedMemoryCache(name, maxsize=16, ttl=None, slot_bytes=slot_bytes, directory=str(directory))
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir(mode=0o700)
+    return directory
+
+
+def test_values_round_trip_as_json_between_processes(cache_dir):
+    writer, reader = _cache(cache_dir), _cache(cache_dir)
+    snapshot = UserSnapshot(id=1, username="ana", is_admin=False)
+    writer.set("user", snapshot)
+    writer.set("resp", (("token",), b'{"items":[]}'))
+    assert reader.get("user") == snapshot
+    assert reader.get("resp") == (("token",), b'{"items":[]}')
+    with pytest.raises(TypeError):
+        writer.set("other", object())
+
+
+def test_unknown_types_in_the_file_are_misses(cache_dir):
+    cache = _cache(cache_dir)
+    cache.set("user", UserSnapshot(id=1, username="ana", is_admin=False))
+    with patch.dict(cache_module.shared_types, clear=True):
+        assert cache.get("user") is None
+
+
+def test_rejects_shared_directories_and_symlinks(tmp_path, cache_dir):
+    open_dir = tmp_path / "open"
+    open_dir.mkdir(mode=0o700)
+    os.chmod(open_dir, 0o777)
+    with pytest.raises(PermissionError):
+        _cache(open_dir).attach()
+
+    target = tmp_path / "elsewhere"
+    target.write_bytes(b"")
+    os.symlink(target, cache_dir / "test.cache")
+    with pytest.raises(OSError):
+        _cache(cache_dir).attach()
+
+
+def test_config_change_replaces_the_file_without_truncating_live_maps(cache_dir):
+    old = _cache(cache_dir, slot_bytes=512)
+    old.set("key", "old")
+    new = _cache(cache_dir, slot_bytes=1024)
+    new.set("key", "new")
+    # El worker antiguo sigue sobre su inodo: ni SIGBUS ni datos mezclados
+    assert old.get("key") == "old"
+    assert new.get("key") == "new"
+    assert _cache(cache_dir, slot_bytes=1024).get("key") == "new"
+
+
+def test_master_removes_cache_files(cache_dir):
+    _cache(cache_dir).set("key", "value")
+    remove_cache_files(str(cache_dir))
+    assert os.listdir(cache_dir) == []
+
+
+def test_shared_backend_requires_a_directory():
+    with patch.object(cache_module, "CACHE_BACKEND", "shared"), patch.object(cache_module, "SHARED_CACHE_DIR", None):
+        with pytest.raises(ValueError):
+            cache_module.create_cache("unconfigured", maxsize=1, ttl=None)
@@ -0,0 +1,77 @@
+import random
+from unittest.mock import patch
+from app.core.trending import LIKE_WEIGHT, PURCHASE_WEIGHT, TrendingEngine
+
+
+def _engine(tmp_path, k=5):
+    return TrendingEngine(half_life=3600, k=k, path=str(tmp_path / "trending.json"))
+
+
+def _expected(scores, k):
+    ranked = sorted(scores, key=lambda pid: scores[pid][0], reverse=True)
+    return ranked[:k]
+
+
+def test_adopt_keeps_exact_top_with_events_pending(tmp_path):
+    engine = _engine(tmp_path)
+    rng = random.Random(7)
+    now = 1_000_000.0
+    file_scores = {pid: (rng.uniform(1, 100), 0.0, now) for pid in range(200)}
+    # Eventos llegados mientras se escribía el fichero: bajan a algunos del top y suben a otros
+    best = _expected(file_scores, 5)
+    engine.record(best[0], -file_scores[best[0]][0] + 0.5, now=now)
+    engine.record(best[1], -1000, now=now)
+    engine.record(150, 500, now=now)
+
+    expected = dict(file_scores)
+    expected[best[0]] = (0.5, 0.0, now)
+    del expected[best[1]]
+    expected[150] = (file_scores[150][0] + 500, 0.0, now)
+    engine._adopt(dict(file_scores))
+    assert [item["product_id"] for item in engine.top(5, now=now)] == _expected(expected, 5)
+
+
+def test_top_serves_previous_ranking_until_persist(tmp_path):
+    engine = _engine(tmp_path, k=3)
+    now = 1_000_000.0
+    for pid, weight in enumerate([50, 40, 30, 20, 10]):
+        engine.record(pid, weight, now=now)
+    engine.persist(now=now)
+
+    engine.discard(0)
+    # Nada de recorrer todas las puntuaciones en la petición: el hueco espera a la persistencia
+    with patch.object(TrendingEngine, "_candidates", side_effect=AssertionError("scan on request path")):
+        assert [item["product_id"] for item in engine.top(3, now=now)] == [1, 2]
+    engine.persist(now=now)
+    assert [item["product_id"] for item in engine.top(3, now=now)] == [1, 2, 3]
+
+
+def test_unlike_only_takes_back_the_like_score(tmp_path):
+    engine = _engine(tmp_path)
+    now = 1_000_000.0
+    engine.record(1, PURCHASE_WEIGHT, now=now)
+    engine.record(1, LIKE_WEIGHT, now=now, like=True)
+    # Una vida media después el like vale la mitad: retirarlo no puede restar más que eso
+    later = now + 3600
+    engine.record(1, -LIKE_WEIGHT, now=later, like=True)
+    assert engine.top(1, now=later) == [{"product_id": 1, "score": PURCHASE_WEIGHT / 2}]
+
+    # Ni siquiera un unlike sin like previo (llegó a otro worker) borra lo comprado
+    engine.record(2, 0.5, now=later)
+    engine.record(2, -LIKE_WEIGHT, now=later, like=True)
+    assert {"product_id": 2, "score": 0.5} in engine.top(5, now=later)
+
+
+def test_unlike_on_another_worker_keeps_purchases_after_persist(tmp_path):
+    a, b = _engine(tmp_path), _engine(tmp_path)
+    now = 1_000_000.0
+    a.record(1, PURCHASE_WEIGHT, now=now)
+    a.record(1, LIKE_WEIGHT, now=now, like=True)
+    a.persist(now=now)
+
+    later = now + 3600
+    b.record(1, -LIKE_WEIGHT, now=later, like=True)
+    b.persist(now=later)
+    a.persist(now=later)
+    for engine in (a, b):
+        assert engine.top(1, now=later) == [{"product_id": 1, "score": PURCHASE_WEIGHT / 2}]
@@ -0,0 +1,22 @@
+from app.models.interactions import ProductLike
+from tests.conftest import auth_headers
+
+
+def test_profile_section_cursor_pages_through_everything(client, session, make_user, make_products):
+    owner = make_user()
+    fan = make_user()
+    product_ids = make_products(owner, 5)
+    session.add_all(ProductLike(user_id=fan.id, product_id=pid) for pid in product_ids)
+    session.commit()
+    headers = auth_headers(fan)
+
+    for limit in (0, 2):
+        profile = client.get(f"/users/me?liked_limit={limit}", headers=headers).json()
+        assert profile["liked_count"] == 5
+        seen = [item["id"] for item in profile["liked_items"]]
+        cursor = profile["next_cursors"]["liked"]
+        while cursor:
+            page = client.get("/users/me/liked", params={"cursor": cursor, "limit": 2}, headers=headers).json()
+            seen += [item["id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+        assert seen == sorted(product_ids, reverse=True)
@@ -0,0 +1,27 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select
+from app import database
+from app.core.versions import bump_version, bump_versions, read_versions, user_version
+from app.models.versions import CacheVersion
+
+
+def _bump(name):
+    with Session(database.engine) as session:
+        version = bump_version(session, name)
+        session.commit()
+        return version
+
+
+def test_concurrent_first_bumps_do_not_collide(client):
+    name = f"test:{uuid.uuid4().hex}"
+    with ThreadPoolExecutor(8) as pool:
+        versions = list(pool.map(_bump, [name] * 8))
+    assert sorted(versions) == list(range(1, 9))
+
+
+def test_missing_user_is_not_versioned(session):
+    bump_versions(session, user_version(None))
+    session.commit()
+    assert session.exec(select(CacheVersion).where(CacheVersion.name == "user:None")).first() is None
+    assert read_versions(session, ["never-bumped"]) == {"never-bumped": 0}